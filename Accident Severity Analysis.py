@@ -1,14 +1,22 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import numpy as np
-import seaborn as sns
+
+from backends import page_aggregates, page_associations
+from charts import aggregate_count_bar
+from figure_cache import cached_figure
+from filters import current_filters
+from instrumentation import stage
+from kpis import SEVERE_LABEL, category_count, get_aggregate_kpi_tables, severe_total, top_category
 
 # --- 1. SETUP: Load Libraries and Data ---
-# Load the dataframe from the CSV you provided.
-# We'll use 'df_cleaned' as the variable name to match your code.
+# Load the shared per-category aggregates for the sidebar filters from the
+# selected query backend (see backends.py). Without filters, the pandas
+# backend parses and merges only rows appended since the last rerun (see
+# incremental.py); filtered results are cached per filter combination.
+filters = current_filters()
 try:
-    df_cleaned = pd.read_csv("student_df.csv")
+    with stage('load', 'page aggregates'):
+        data_version, aggregates = page_aggregates(filters)
 except FileNotFoundError:
     st.error("Error: 'student_df.csv' not found. Make sure it's in the same folder as your app.py.")
     st.stop()
@@ -25,6 +33,65 @@ st.set_page_config(layout="wide")
 st.header("Key High-Risk Environmental & Situational Factors")
 st.write("These metrics highlight the conditions most associated with severe accidents in the dataset.")
 
+# --- KPI values, computed from the data (see kpis.py) ---
+if aggregates.rows == 0:
+    st.warning("No records match the selected filters.")
+    st.stop()
+if filters.active:
+    st.caption(f"Filtered to {aggregates.rows:,} records ({filters.describe()}).")
+
+with stage('aggregate', 'kpis'):
+    kpi = get_aggregate_kpi_tables(data_version, aggregates)
+severe_count = severe_total(kpi)
+road_type, road_type_severe = top_category(kpi, 'Road_Type')
+road_condition, road_condition_severe = top_category(kpi, 'Road_condition')
+risk_time, risk_time_total = top_category(kpi, 'Time_of_Day', by='Total')
+risk_time_severe = category_count(kpi, 'Time_of_Day', risk_time, by=SEVERE_LABEL)
+busiest_road_type, _ = top_category(kpi, 'Road_Type', by='Total')
+conditions = " and ".join(str(c) for c in kpi.counts['Road_condition'].index)
+
+# The commentary below follows the numbers, which change with the filters.
+# top_category gives ``None`` when the selection has no severe accidents.
+NO_SEVERE = "No severe accidents match the current selection."
+if road_type is None:
+    road_type_value = "n/a"
+    road_type_help = NO_SEVERE
+    road_type_text = NO_SEVERE
+else:
+    if busiest_road_type == road_type:
+        road_type_note = "and it also records the highest total number of incidents"
+    else:
+        road_type_note = f"despite not recording the highest total number of incidents ({busiest_road_type} does)"
+    road_type_value = str(road_type)
+    road_type_help = (f"{road_type} accounts for the highest raw count of Severe Accidents ({road_type_severe:,} "
+                      "cases), making it the riskiest environment for severe outcomes.")
+    road_type_text = (f"Collisions on {road_type} are statistically the most prone to result in severe outcomes "
+                      f"({road_type_severe:,} cases), {road_type_note}.")
+
+if road_condition is None:
+    road_condition_value = road_condition_heading = "n/a"
+    road_condition_help = NO_SEVERE
+    road_condition_text = NO_SEVERE
+else:
+    road_condition_value = f"{road_condition} ({road_condition_severe:,})"
+    road_condition_heading = f"{road_condition} – {road_condition_severe:,}"
+    if str(road_condition).lower() == 'wet':
+        road_condition_help = (f"Wet roads show the highest count of Severe Accidents ({road_condition_severe:,} "
+                               "cases), consistent with their reduced traction.")
+        road_condition_text = (
+            f"Wet surfaces record the highest count of severe incidents (**{road_condition_severe:,} cases**), "
+            "consistent with the reduced traction of wet roads."
+        )
+    else:
+        road_condition_help = (f"{road_condition} roads show the highest count of Severe Accidents "
+                               f"({road_condition_severe:,} cases), suggesting increased speed/reduced caution may "
+                               "overcome better traction.")
+        road_condition_text = (
+            f"Despite the natural slipperiness of wet roads, {str(road_condition).lower()} surfaces record the "
+            f"highest count of severe incidents (**{road_condition_severe:,} cases**). This suggests riders' "
+            "perceived safety leads to increased speeds and consequently, more severe collisions."
+        )
+
 # Create 4 columns
 col1, col2, col3, col4 = st.columns(4)
 
@@ -33,7 +100,7 @@ with col1:
     with st.container(border=True):
         st.metric(
             label="Overall Severe Accidents",
-            value="2,644",
+            value=f"{severe_count:,}",
             help="Total count of 'Severe Accident' cases across all conditions."
         )
 
@@ -42,8 +109,8 @@ with col2:
     with st.container(border=True):
         st.metric(
             label="Most Severe Road Type",
-            value="Highway",
-            help="Highways account for the highest raw count of Severe Accidents (1,139 cases), making it the riskiest environment for severe outcomes."
+            value=road_type_value,
+            help=road_type_help
         )
 
 # --- Column 3: Road Condition (Highest Severe Count) ---
@@ -51,8 +118,8 @@ with col3:
     with st.container(border=True):
         st.metric(
             label="Road Condition Risk",
-            value="Dry (1,974)",
-            help="Dry roads show the highest count of Severe Accidents (1,974 cases), suggesting increased speed/reduced caution may overcome better traction."
+            value=road_condition_value,
+            help=road_condition_help
         )
 
 # --- Column 4: Time of Day (Highest Risk Period) ---
@@ -60,63 +127,62 @@ with col4:
     with st.container(border=True):
         st.metric(
             label="Highest Risk Time",
-            value="Afternoon",
-            help="The Afternoon period accounts for the highest total accidents (2,451) and the highest Severe Accident count (1,221)."
+            value=str(risk_time),
+            help=f"The {risk_time} period accounts for the highest total accidents ({risk_time_total:,}) and {risk_time_severe:,} Severe Accident cases."
         )
 
-st.info("""
+st.info(f"""
 
-* **1. Overall Severe Accidents (2,644):** This figure establishes the total size of the high-consequence issue, representing the complete number of all 'Severe Accident' instances recorded across the main road conditions Dry and Wet.
+* **1. Overall Severe Accidents ({severe_count:,}):** This figure establishes the total size of the high-consequence issue, representing the complete number of all 'Severe Accident' instances recorded across the main road conditions {conditions}.
 
-* **2. Most Severe Road Type (Highway):** This metric highlights the environment presenting the greatest likelihood of fatal or serious injury. Collisions on Highways are statistically the most prone to result in severe outcomes (1,139 cases), despite not recording the highest total number of incidents.
+* **2. Most Severe Road Type ({road_type_value}):** This metric highlights the environment presenting the greatest likelihood of fatal or serious injury. {road_type_text}
 
-* **3. Road Condition Risk (Dry – 1,974):** This measure identifies the road condition most commonly associated with severe accidents. Despite the natural slipperiness of wet roads, dry surfaces record a significantly higher count of severe incidents (**1,974 cases**). This suggests riders' perceived safety leads to increased speeds and consequently, more severe collisions.
+* **3. Road Condition Risk ({road_condition_heading}):** This measure identifies the road condition most commonly associated with severe accidents. {road_condition_text}
 
-* **4. Highest Risk Time (Afternoon):** This analysis pinpoints the time period with the greatest risk of accidents. The Afternoon records both the highest number of total accidents (2,451) and the highest number of severe accidents (**1,221**). This heightened risk likely stems from factors such as heavy traffic and fatigue.
+* **4. Highest Risk Time ({risk_time}):** This analysis pinpoints the time period with the greatest risk of accidents. The {risk_time} records the highest number of total accidents ({risk_time_total:,}) and **{risk_time_severe:,}** severe accidents. This heightened risk likely stems from factors such as heavy traffic and fatigue.
 """)
 
 
-fig1 = px.histogram(
-    df_cleaned,
+fig1 = cached_figure(data_version, 'severity/road_condition', lambda: aggregate_count_bar(
+    aggregates,
     x='Road_condition',
     color='Accident_Severity',
-    barmode='group',  # Creates grouped bars (like sns.countplot)
     color_discrete_sequence=px.colors.qualitative.Pastel, # Matches palette
     title='Accident Severity by Road Condition',
     labels={
         'Road_condition': 'Road Condition',
-        'count': 'Count'  # px.histogram auto-generates 'count'
+        'count': 'Count'  # bars are server-side counts (see charts.py)
     }
-)
-st.plotly_chart(fig1, use_container_width=True)
+))
+with stage('serialize', 'severity/road_condition'):
+    st.plotly_chart(fig1, use_container_width=True)
 
 st.success("""Dry roads represent the highest severity risk in terms of raw count. The perceived safety of these conditions may lead to overconfidence and consequently more serious collisions.""")
 
 
-fig2 = px.histogram(
-    df_cleaned,
+fig2 = cached_figure(data_version, 'severity/road_type', lambda: aggregate_count_bar(
+    aggregates,
     x='Road_Type',
     color='Accident_Severity',
-    barmode='group',
    color_discrete_sequence=px.colors.qualitative.Pastel,
     title='Accident Severity by Road Type',
     labels={
         'Road_Type': 'Road Type',
         'count': 'Count'
     }
-)
-st.plotly_chart(fig2, use_container_width=True)
+))
+with stage('serialize', 'severity/road_type'):
+    st.plotly_chart(fig2, use_container_width=True)
 
 st.success("""Road type determines accident consequences. Highways pose the greatest threat for severe accidents. Meanwhile village roads, despite higher frequency have the lowest severity rate.""")
 
 # Define the specific order from your original code
 time_order = ['Morning', 'Noon', 'Afternoon', 'Evening', 'Night']
 
-fig3 = px.histogram(
-    df_cleaned,
+fig3 = cached_figure(data_version, 'severity/time_of_day', lambda: aggregate_count_bar(
+    aggregates,
     x='Time_of_Day',
     color='Accident_Severity',
-    barmode='group',
     color_discrete_sequence=px.colors.qualitative.Pastel,
     category_orders={
         'Time_of_Day': time_order  # This applies your specific order
@@ -126,8 +192,47 @@ fig3 = px.histogram(
         'Time_of_Day': 'Time of Day',
         'count': 'Count'
     }
-)
-st.plotly_chart(fig3, use_container_width=True)
+))
+with stage('serialize', 'severity/time_of_day'):
+    st.plotly_chart(fig3, use_container_width=True)
 
 st.success("""The afternoon presents the highest situational risk, as evidenced by its large share of severe accidents. Environmental and human factors such as peak traffic and does not alert to situation contribute significantly to this elevated danger.""")
 
+
+# --- 4. Association of every factor with Accident Severity ---
+# Chi-square / Cramér's V for each column against Accident_Severity, and for
+# every pair of columns, computed from contingency tables (see association.py).
+# Without filters the tables come from the mergeable pair counts of the
+# precomputed artifact or the incremental aggregator; with filters the query
+# backend builds them.
+st.header("Association of Each Factor with Accident Severity")
+st.write("Cramér's V ranges from 0 (no association) to 1 (perfect association). The p-value comes from the chi-square test of independence.")
+
+with stage('aggregate', 'associations'):
+    assoc_version, ranked, cramers_v = page_associations(filters)
+
+st.dataframe(
+    ranked,
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "Cramér's V": st.column_config.ProgressColumn("Cramér's V", format="%.3f", min_value=0.0, max_value=1.0),
+        'Chi-square': st.column_config.NumberColumn('Chi-square', format="%.1f"),
+        'p-value': st.column_config.NumberColumn('p-value', format="%.2e"),
+    },
+)
+
+fig4 = cached_figure(assoc_version, 'severity/cramers_v_heatmap', lambda: px.imshow(
+    cramers_v,
+    color_continuous_scale='Viridis',
+    zmin=0,
+    zmax=1,
+    aspect='auto',
+    title="Cramér's V Between All Factors",
+    labels={'color': "Cramér's V"}
+))
+with stage('serialize', 'severity/cramers_v_heatmap'):
+    st.plotly_chart(fig4, use_container_width=True)
+
+top = ranked.iloc[0]
+st.success(f"""{top['Factor'].replace('_', ' ')} shows the strongest association with accident severity (Cramér's V = {top["Cramér's V"]:.2f}), ahead of {ranked.iloc[1]['Factor'].replace('_', ' ')} and {ranked.iloc[2]['Factor'].replace('_', ' ')}.""")
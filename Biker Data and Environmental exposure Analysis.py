@@ -1,14 +1,22 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import numpy as np
-import seaborn as sns
+
+from backends import page_aggregates
+from charts import aggregate_box_stats, aggregate_count_bar, summary_box
+from figure_cache import cached_figure
+from filters import current_filters
+from instrumentation import stage
+from kpis import category_count, get_aggregate_kpi_tables, group_mean, top_category
 
 # --- 1. SETUP: Load Libraries and Data ---
-# Load the dataframe from the CSV you provided.
-# We'll use 'df_cleaned' as the variable name to match your code.
+# Load the shared per-category aggregates for the sidebar filters from the
+# selected query backend (see backends.py). Without filters, the pandas
+# backend parses and merges only rows appended since the last rerun (see
+# incremental.py); filtered results are cached per filter combination.
+filters = current_filters()
 try:
-    df_cleaned = pd.read_csv("student_df.csv")
+    with stage('load', 'page aggregates'):
+        data_version, aggregates = page_aggregates(filters)
 except FileNotFoundError:
     st.error("Error: 'student_df.csv' not found. Make sure it's in the same folder as your app.py.")
     st.stop()
@@ -25,6 +33,26 @@ st.set_page_config(layout="wide")
 st.header("Key Demographic and Exposure Factors")
 st.write("These metrics summarize rider characteristics and road usage patterns across different conditions.")
 
+# --- KPI values, computed from the data (see kpis.py) ---
+if aggregates.rows == 0:
+    st.warning("No records match the selected filters.")
+    st.stop()
+if filters.active:
+    st.caption(f"Filtered to {aggregates.rows:,} records ({filters.describe()}).")
+
+with stage('aggregate', 'kpis'):
+    kpi = get_aggregate_kpi_tables(data_version, aggregates)
+mean_age = kpi.overall_means['Biker_Age']
+age_no_helmet = group_mean(kpi, 'Wearing_Helmet', 'Biker_Age', 'No')
+age_helmet = group_mean(kpi, 'Wearing_Helmet', 'Biker_Age', 'Yes')
+helmet_no = category_count(kpi, 'Wearing_Helmet', 'No')
+helmet_yes = category_count(kpi, 'Wearing_Helmet', 'Yes')
+usage_road, usage_road_total = top_category(kpi, 'Road_Type', by='Total')
+mean_speed = kpi.overall_means['Bike_Speed']
+speed_by_weather = kpi.group_means[('Weather', 'Bike_Speed')].sort_values(ascending=False)
+speed_examples = ", ".join(f"{speed:.2f} in {weather}" for weather, speed in speed_by_weather.items())
+weather_names = ", ".join(str(w) for w in speed_by_weather.index)
+
 # Create 4 columns
 col1, col2, col3, col4 = st.columns(4)
 
@@ -33,8 +61,8 @@ with col1:
     with st.container(border=True):
         st.metric(
             label="Average Biker Age",
-            value="22.5 Years",
-            help="The mean age across all riders in the dataset, regardless of helmet use (22.57 years without helmet, 22.41 years with helmet)."
+            value=f"{mean_age:.1f} Years",
+            help=f"The mean age across all riders in the dataset, regardless of helmet use ({age_no_helmet:.2f} years without helmet, {age_helmet:.2f} years with helmet)."
         )
 
 # --- Column 2: Helmet Use (Compliance Rate) ---
@@ -42,8 +70,8 @@ with col2:
     with st.container(border=True):
         st.metric(
             label="Helmet Non-Compliance",
-            value="3,180 Riders",
-            help="The count of riders who were not wearing a helmet, which is the majority group in the dataset (3,180 No vs. 2,162 Yes)."
+            value=f"{helmet_no:,} Riders",
+            help=f"The count of riders who were not wearing a helmet ({helmet_no:,} No vs. {helmet_yes:,} Yes)."
         )
 
 # --- Column 3: Road Type (Highest Usage) ---
@@ -51,8 +79,8 @@ with col3:
     with st.container(border=True):
         st.metric(
             label="Highest Usage Road Type",
-            value="Village Road",
-            help="Village Roads are the most frequently used environment, accounting for the highest total incidents (2,181)."
+            value=str(usage_road),
+            help=f"{usage_road}s are the most frequently used environment, accounting for the highest total incidents ({usage_road_total:,})."
         )
 
 # --- Column 4: Weather Condition (Average Speed Consistency) ---
@@ -60,50 +88,49 @@ with col4:
     with st.container(border=True):
         st.metric(
             label="Speed Consistency",
-            value="~ 79 Avg. Speed",
-            help="The average Bike Speed is consistent across all weather conditions (e.g., 79.41 in Clear, 78.06 in Rainy), indicating a lack of speed mitigation."
+            value=f"~ {mean_speed:.0f} Avg. Speed",
+            help=f"The average Bike Speed across weather conditions ({speed_examples}), indicating whether riders mitigate speed."
         )
 
-st.info("""
+st.info(f"""
 
-* **1. Average Biker Age (22.5 Years):**
-    The mean rider age across the dataset is 22.5 years, highlighting a concentration of motorcyclists within the 15–30 age group. This demographic baseline frames all subsequent risk analyses.
+* **1. Average Biker Age ({mean_age:.1f} Years):**
+    The mean rider age across the dataset is {mean_age:.1f} years, highlighting a concentration of motorcyclists within the 15–30 age group. This demographic baseline frames all subsequent risk analyses.
 
-* **2. Helmet Non-Compliance (3,180 Riders):**
-    A critical safety insight shows that most riders (3,180) do not wear helmets, compared to (2,162) who do. This widespread non-compliance represents a major, unmitigated safety concern.
+* **2. Helmet Non-Compliance ({helmet_no:,} Riders):**
+    A critical safety insight shows that ({helmet_no:,}) riders do not wear helmets, compared to ({helmet_yes:,}) who do. This widespread non-compliance represents a major, unmitigated safety concern.
 
-* **3. Highest Usage Road Type (Village Road):**
-    Village Roads are the most frequently used environments, registering (2,181) total accidents. This indicates that they are the most common routes for this rider demographic and thus present the highest exposure risk.
+* **3. Highest Usage Road Type ({usage_road}):**
+    {usage_road}s are the most frequently used environments, registering ({usage_road_total:,}) total accidents. This indicates that they are the most common routes for this rider demographic and thus present the highest exposure risk.
 
-* **4. Speed Consistency (~79 Avg. Speed):**
-    Average bike speed remains high and consistent around 79 km/h across all weather types such as Clear, Foggy, and Rainy. This reveals a lack of adaptive behavior to changing conditions, suggesting many riders fail to reduce speed in hazardous weather, compounding the risk.
+* **4. Speed Consistency (~{mean_speed:.0f} Avg. Speed):**
+    Average bike speed remains high and consistent around {mean_speed:.0f} km/h across all weather types such as {weather_names}. This reveals a lack of adaptive behavior to changing conditions, suggesting many riders fail to reduce speed in hazardous weather, compounding the risk.
 """)
 # --- 3. Visualization: Biker Age Distribution by Helmet Use ---
 
 
-fig1 = px.box(
-    df_cleaned,
+fig1 = cached_figure(data_version, 'exposure/age_by_helmet', lambda: summary_box(
+    aggregate_box_stats(aggregates, 'Wearing_Helmet', 'Biker_Age'),  # quartiles/whiskers from cached counts
     x='Wearing_Helmet',
     y='Biker_Age',
-    color='Wearing_Helmet', # Assign color to match x-axis
     title='Biker Age Distribution by Helmet Use',
     labels={
         'Wearing_Helmet': 'Wearing Helmet',
         'Biker_Age': 'Biker Age'
     }
-)
-st.plotly_chart(fig1, use_container_width=True)
+))
+with stage('serialize', 'exposure/age_by_helmet'):
+    st.plotly_chart(fig1, use_container_width=True)
 
 st.success("""Helmet-wearing behavior is consistent across the 15–30 age range. Compliance appears to depend more on individual awareness or enforcement rather than demographic differences.""")
 
 
 # --- 4. Visualization: Road Type Distribution by Weather Condition ---
 
-fig2 = px.histogram(
-    df_cleaned,
+fig2 = cached_figure(data_version, 'exposure/road_type_by_weather', lambda: aggregate_count_bar(
+    aggregates,
     x='Weather',
     color='Road_Type',
-    barmode='group',
     color_discrete_sequence=px.colors.sequential.Viridis, # As in your code
     # color_discrete_sequence=px.colors.qualitative.Pastel, # For pastel
     title='Road Type Distribution by Weather Condition',
@@ -112,24 +139,25 @@ fig2 = px.histogram(
         'count': 'Count',
         'Road_Type': 'Road Type'
     }
-)
-st.plotly_chart(fig2, use_container_width=True)
+))
+with stage('serialize', 'exposure/road_type_by_weather'):
+    st.plotly_chart(fig2, use_container_width=True)
 
 st.success("""Village roads remain the most consistently used routes, regardless of weather. Their high traffic frequency increases exposure and consequently the likelihood of accidents.""")
 
 # --- 5. Visualization: Bike Speed vs Weather Condition ---
 
-fig3 = px.box(
-    df_cleaned,
+fig3 = cached_figure(data_version, 'exposure/speed_by_weather', lambda: summary_box(
+    aggregate_box_stats(aggregates, 'Weather', 'Bike_Speed'),  # quartiles/whiskers from cached counts
     x='Weather',
     y='Bike_Speed',
-    color='Weather', # Assign color to match x-axis
     title='Bike Speed vs Weather Condition',
     labels={
         'Weather': 'Weather Condition',
         'Bike_Speed': 'Bike Speed'
     }
-)
-st.plotly_chart(fig3, use_container_width=True)
+))
+with stage('serialize', 'exposure/speed_by_weather'):
+    st.plotly_chart(fig3, use_container_width=True)
 
 st.success("""Riders generally fail to adjust speed during adverse weather conditions. This behavioral rigidity, combined with reduced visibility or road grip, significantly increases accident severity risk.""")
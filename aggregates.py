@@ -0,0 +1,183 @@
+from dataclasses import dataclass, field
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from association import association_tables
+
+# --- Mergeable per-category aggregates ---
+# Everything the analysis pages chart or put on a card reduces to two kinds of
+# counts: rows per (category, category) pair and rows per (category, value)
+# pair for the small-integer numeric columns. Counts add, so aggregates built
+# over separate chunks of the file (or over rows appended later) merge
+# exactly, and quantiles, means and crosstabs can be read back from them.
+# On request they also hold counts for every pair of columns, from which the
+# severity page's association tables are built (see association.py).
+
+SEVERITY_COLUMN = 'Accident_Severity'
+
+# Categorical columns compared against Accident_Severity.
+SEVERITY_FACTORS = ['Road_condition', 'Road_Type', 'Time_of_Day', 'Wearing_Helmet', 'Weather']
+
+COUNT_PAIRS = [(column, SEVERITY_COLUMN) for column in SEVERITY_FACTORS] + [('Weather', 'Road_Type')]
+
+# (group column, numeric column) pairs kept as exact per-value counts; the
+# numeric columns only take a few dozen distinct whole-number values.
+VALUE_PAIRS = [('Wearing_Helmet', 'Biker_Age'), ('Weather', 'Bike_Speed')]
+
+# Columns of the sidebar filters (see filters.py). Their distinct values are
+# kept in ``order`` too, so the filter widgets are filled in from the
+# aggregates rather than from the full frame.
+FILTER_COLUMNS = ['Road_Type', 'Weather', 'Time_of_Day', 'Biker_Age', 'Bike_Speed', 'Traffic_Density']
+
+AGGREGATE_COLUMNS = sorted({c for pair in COUNT_PAIRS + VALUE_PAIRS for c in pair} | set(FILTER_COLUMNS))
+
+
+def _empty_counts(names):
+    index = pd.MultiIndex.from_arrays([[], []], names=list(names))
+    return pd.Series([], index=index, dtype='int64', name='count')
+
+
+@dataclass(frozen=True)
+class Aggregates:
+    """Row counts per category pair and per (category, value) pair."""
+    rows: int = 0
+    order: dict = field(default_factory=dict)         # column -> values in first-appearance order
+    pair_counts: dict = field(default_factory=dict)   # (a, b) -> Series indexed by (a, b)
+    value_counts: dict = field(default_factory=dict)  # (group, value) -> Series indexed by (group, value)
+    table_counts: dict = field(default_factory=dict)  # every (a, b) column pair, in file order -> Series
+
+    def merge(self, *others):
+        """Return the aggregates of every input's rows combined."""
+        parts = (self,) + others
+        order = {}
+        for part in parts:
+            for column, values in part.order.items():
+                seen = order.get(column, ())
+                order[column] = tuple(seen) + tuple(v for v in values if v not in seen)
+
+        def add(kind):
+            # One concat + groupby per key, however many parts are merged.
+            collected = {}
+            for part in parts:
+                for key, counts in getattr(part, kind).items():
+                    collected.setdefault(key, []).append(counts)
+            return {
+                key: series[0] if len(series) == 1
+                else pd.concat(series).groupby(level=[0, 1]).sum().astype('int64')
+                for key, series in collected.items()
+            }
+
+        return Aggregates(
+            rows=sum(part.rows for part in parts),
+            order=order,
+            pair_counts=add('pair_counts'),
+            value_counts=add('value_counts'),
+            table_counts=add('table_counts'),
+        )
+
+    def options(self, column):
+        """Distinct values of ``column``, sorted, for a filter widget."""
+        return sorted(self.order.get(column, ()))
+
+    def bounds(self, column):
+        """``(min, max)`` of a numeric column, as ints when every value is whole."""
+        values = np.asarray(self.order[column], dtype=float)
+        low, high = values.min(), values.max()
+        if np.all(values == np.round(values)):
+            return int(low), int(high)
+        return float(low), float(high)
+
+    def count_table(self, x, color):
+        """Long ``(x, color, count)`` frame of the non-empty pairs."""
+        counts = self.pair_counts.get((x, color), _empty_counts((x, color)))
+        return counts[counts > 0].reset_index()
+
+    def crosstab(self, x, color):
+        """``x`` by ``color`` count table (sorted index, zeros filled)."""
+        counts = self.pair_counts.get((x, color), _empty_counts((x, color)))
+        return counts.unstack(fill_value=0).sort_index().astype('int64')
+
+    def associations(self):
+        """``(ranked severity table, Cramér's V matrix)`` from ``table_counts``."""
+        # Pairs are kept in ``combinations`` order, so this is the file's column order.
+        columns = list(dict.fromkeys(column for pair in self.table_counts for column in pair))
+        tables = {
+            pair: counts.unstack(fill_value=0).to_numpy() if len(counts) else np.zeros((0, 0), dtype=np.int64)
+            for pair, counts in self.table_counts.items()
+        }
+        return association_tables(columns, tables)
+
+    def values(self, group, value):
+        """Return ``{category: (sorted values, counts)}`` for a VALUE_PAIRS entry."""
+        counts = self.value_counts.get((group, value), _empty_counts((group, value)))
+        result = {}
+        for category, part in counts[counts > 0].groupby(level=0, sort=False):
+            part = part.droplevel(0).sort_index()
+            result[category] = (part.index.to_numpy(dtype=float), part.to_numpy(dtype=np.int64))
+        return result
+
+
+def group_counts(df, pair):
+    """Row counts per value combination of the two columns in ``pair``."""
+    counts = df.groupby(list(pair), observed=True).size().astype('int64').rename('count')
+    # Plain (non-categorical) levels so counts from different frames align on merge.
+    levels = [
+        level.astype(object) if isinstance(level.dtype, pd.CategoricalDtype) else level
+        for level in (counts.index.get_level_values(i) for i in range(len(pair)))
+    ]
+    counts.index = pd.MultiIndex.from_arrays(levels, names=list(pair))
+    return counts
+
+
+def all_pair_counts(df):
+    """Row counts for every pair of columns of ``df``, skipping rows missing either value.
+
+    Each column is factorized once; a pair is then one ``np.bincount``.
+    """
+    coded = {column: pd.factorize(df[column]) for column in df.columns}
+    counts = {}
+    for a, b in combinations(df.columns, 2):
+        (a_codes, a_labels), (b_codes, b_labels) = coded[a], coded[b]
+        n_b = len(b_labels)
+        flat = a_codes * n_b + b_codes
+        if a_codes.min(initial=0) < 0 or b_codes.min(initial=0) < 0:
+            flat = flat[(a_codes >= 0) & (b_codes >= 0)]
+        flat = np.bincount(flat, minlength=len(a_labels) * n_b)
+        cells = np.flatnonzero(flat)
+        # The factorized uniques are the levels as they are; no second factorize.
+        index = pd.MultiIndex(levels=[a_labels, b_labels], codes=[cells // n_b, cells % n_b], names=[a, b])
+        counts[(a, b)] = pd.Series(flat[cells].astype('int64'), index=index, name='count')
+    return counts
+
+
+def aggregate_frame(df, tables=False):
+    """Build :class:`Aggregates` for ``df`` with one groupby per tracked pair.
+
+    With ``tables`` the counts of every column pair are built too.
+    """
+    order = {
+        column: tuple(v for v in pd.unique(df[column]) if pd.notna(v))
+        for column in AGGREGATE_COLUMNS if column in df
+    }
+    pair_counts = {pair: group_counts(df, pair) for pair in COUNT_PAIRS if set(pair) <= set(df.columns)}
+    value_counts = {pair: group_counts(df, pair) for pair in VALUE_PAIRS if set(pair) <= set(df.columns)}
+    return Aggregates(rows=len(df), order=order, pair_counts=pair_counts, value_counts=value_counts,
+                      table_counts=all_pair_counts(df) if tables else {})
+
+
+def weighted_quantiles(values, counts, quantiles):
+    """Quantiles of ``values`` repeated ``counts`` times, using NumPy's 'linear' rule.
+
+    Gives the same result as ``np.quantile(np.repeat(values, counts), q)``
+    without materializing the repeated array.
+    """
+    cumulative = np.cumsum(counts)
+    n = cumulative[-1]
+    positions = (n - 1) * np.asarray(quantiles, dtype=float)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, n - 1)
+    lower_values = values[np.searchsorted(cumulative, lower, side='right')]
+    upper_values = values[np.searchsorted(cumulative, upper, side='right')]
+    return lower_values + (positions - lower) * (upper_values - lower_values)
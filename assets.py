@@ -0,0 +1,177 @@
+"""Local image assets for the Homepage.
+
+Usage::
+
+    python assets.py [--fetch] [--width 704]
+
+Images are served from the ``assets/`` folder next to this file, so rendering
+a page never touches the network. Each image is stored once more, resized to
+the width it is displayed at, and the app keeps the encoded bytes of the
+resized copies in a process-wide LRU bounded by ``MAX_BYTES``. An image
+that is not on disk is shown from its original URL in ``SOURCES``, loaded by
+the browser as before the cache existed, and reported by ``startup.py``.
+
+``python assets.py --fetch`` downloads the originals into ``assets/``; commit
+or ship that folder so the Homepage needs no network. Every run rebuilds the
+resized copies that are older than their original and exits non-zero if an
+image is still missing.
+"""
+import argparse
+import io
+import os
+import sys
+import urllib.request
+from pathlib import Path
+
+import streamlit as st
+
+from lru import BytesLRU
+
+ASSET_DIR = Path(__file__).with_name('assets')
+
+# Original location of every image the app shows.
+SOURCES = {
+    '3u1i.jpeg': 'https://raw.githubusercontent.com/fakhitah3/FHPK-TVET/main/3u1i.jpeg',
+    '3u1i_2.jpeg': 'https://raw.githubusercontent.com/fakhitah3/FHPK-TVET/main/3u1i_2.jpeg',
+}
+
+# Content width of Streamlit's default "centered" layout, which the Homepage
+# uses; st.image(..., use_container_width=True) never draws wider than this.
+DISPLAY_WIDTH = 704
+JPEG_QUALITY = 85
+MAX_BYTES = 8 << 20
+
+
+def resized_path(name, width, directory=ASSET_DIR):
+    name = Path(name)
+    return Path(directory) / f"{name.stem}_{width}w.jpeg"
+
+
+def resize_image(data, width, quality=JPEG_QUALITY):
+    """Return ``data`` re-encoded as a progressive JPEG no wider than ``width``."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def build_resized(name, width, directory=ASSET_DIR):
+    """Write the resized copy of ``name`` if it is missing or older than the original.
+
+    Returns its path, or ``None`` if the original is not on disk either.
+    """
+    source = Path(directory) / name
+    target = resized_path(name, width, directory)
+    try:
+        source_mtime = source.stat().st_mtime_ns
+    except OSError:
+        return target if target.exists() else None
+    if target.exists() and target.stat().st_mtime_ns >= source_mtime:
+        return target
+    tmp = target.with_suffix('.tmp')
+    tmp.write_bytes(resize_image(source.read_bytes(), width))
+    os.replace(tmp, target)
+    return target
+
+
+class AssetStore:
+    """Resized image bytes from ``directory``, cached in a :class:`lru.BytesLRU`."""
+
+    def __init__(self, directory=ASSET_DIR, max_bytes=MAX_BYTES):
+        self.directory = Path(directory)
+        self.cache = BytesLRU(max_bytes)
+
+    def image(self, name, width=DISPLAY_WIDTH):
+        """Encoded bytes of ``name`` at ``width``, or ``None`` if the asset is missing."""
+        path = resized_path(name, width, self.directory)
+        try:
+            stat = path.stat()
+        except OSError:
+            # No resized copy yet: make one from the original if it is here.
+            try:
+                path = build_resized(name, width, self.directory)
+            except (OSError, ValueError):
+                path = None
+            if path is None:
+                return None
+            stat = path.stat()
+        key = (name, width, stat.st_mtime_ns, stat.st_size)
+        data = self.cache.get(key)
+        if data is None:
+            try:
+                data = path.read_bytes()
+            except OSError:
+                return None
+            self.cache.put(key, data)
+        return data
+
+
+@st.cache_resource(show_spinner=False)
+def get_asset_store(directory=str(ASSET_DIR), max_bytes=MAX_BYTES):
+    """The process-wide :class:`AssetStore` shared by every session."""
+    return AssetStore(directory, max_bytes)
+
+
+def missing_assets(width=DISPLAY_WIDTH, directory=ASSET_DIR):
+    """Names in ``SOURCES`` with neither a resized copy nor an original on disk."""
+    directory = Path(directory)
+    return [name for name in SOURCES
+            if not resized_path(name, width, directory).exists() and not (directory / name).exists()]
+
+
+def show_image(name, width=DISPLAY_WIDTH, **kwargs):
+    """``st.image`` for a local asset, falling back to its original URL if it is missing."""
+    data = get_asset_store().image(name, width)
+    st.image(SOURCES[name] if data is None else data, **kwargs)
+
+
+# --- CLI ---
+
+def fetch(names, directory=ASSET_DIR):
+    """Download ``names`` from ``SOURCES``; return the names that could not be fetched."""
+    directory.mkdir(parents=True, exist_ok=True)
+    failed = []
+    for name in names:
+        try:
+            with urllib.request.urlopen(SOURCES[name], timeout=30) as response:
+                data = response.read()
+        except OSError as exc:
+            print(f"Could not fetch {name} from {SOURCES[name]}: {exc}", file=sys.stderr)
+            failed.append(name)
+            continue
+        tmp = directory / f"{name}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, directory / name)
+        print(f"Fetched {name} ({len(data):,} bytes)")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fetch', action='store_true', help="download the originals in SOURCES first")
+    parser.add_argument('--width', type=int, default=DISPLAY_WIDTH)
+    args = parser.parse_args(argv)
+
+    if args.fetch:
+        fetch(SOURCES)
+    missing = []
+    for name in SOURCES:
+        path = build_resized(name, args.width)
+        if path is None:
+            missing.append(name)
+        else:
+            print(f"{path.name}: {path.stat().st_size:,} bytes")
+    if missing:
+        print(f"Missing originals in {ASSET_DIR}: {', '.join(missing)}; "
+              f"run `python assets.py --fetch` on a connected machine", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import math
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# --- Severity association engine ---
+# Every column is integer-coded once; a contingency table of two columns is
+# then a single np.bincount over ``a_code * n_b + b_code``, with no
+# pd.crosstab calls. Chi-square, p-value and Cramér's V are computed from the
+# tables in NumPy. Numeric columns are treated as categorical on their
+# distinct values.
+
+SEVERITY_COLUMN = 'Accident_Severity'
+MAX_OFFSET_CODES = 4096
+
+
+def encode_columns(df, columns=None):
+    """Return ``{column: (codes, n_categories)}`` with ``-1`` for missing values."""
+    encoded = {}
+    for column in columns if columns is not None else df.columns:
+        series = df[column]
+        if pd.api.types.is_integer_dtype(series.dtype) and len(series):
+            # Small whole-number columns are coded by offset, skipping the sort.
+            values = series.to_numpy(dtype=np.int64)
+            low, high = int(values.min()), int(values.max())
+            if high - low < MAX_OFFSET_CODES:
+                encoded[column] = (values - low, high - low + 1)
+                continue
+        categorical = series.cat if isinstance(series.dtype, pd.CategoricalDtype) else pd.Categorical(series)
+        codes = np.asarray(categorical.codes, dtype=np.int64)
+        encoded[column] = (codes, len(categorical.categories))
+    return encoded
+
+
+def contingency(a, b):
+    """Contingency table of two ``(codes, n)`` pairs, skipping rows missing either."""
+    (a_codes, a_n), (b_codes, b_n) = a, b
+    valid = (a_codes >= 0) & (b_codes >= 0)
+    flat = a_codes[valid] * b_n + b_codes[valid]
+    return np.bincount(flat, minlength=a_n * b_n).reshape(a_n, b_n)
+
+
+def chi2_sf(x, dof):
+    """Survival function of the chi-square distribution for integer ``dof``.
+
+    Uses the closed forms for even and odd degrees of freedom, summed in log
+    space so large statistics do not overflow.
+    """
+    if dof <= 0 or x <= 0:
+        return 1.0
+    half = x / 2.0
+    log_half = math.log(half)
+    if dof % 2 == 0:
+        terms = (i * log_half - math.lgamma(i + 1) - half for i in range(dof // 2))
+        return min(1.0, sum(math.exp(t) for t in terms))
+    tail = math.erfc(math.sqrt(half))
+    terms = ((i - 0.5) * log_half - math.lgamma(i + 0.5) - half for i in range(1, (dof + 1) // 2))
+    return min(1.0, tail + sum(math.exp(t) for t in terms))
+
+
+def association(table):
+    """Return ``(chi2, dof, p_value, cramers_v, n)`` for a contingency table."""
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    n = int(table.sum())
+    rows, cols = table.shape
+    if n == 0 or rows < 2 or cols < 2:
+        return 0.0, 0, 1.0, 0.0, n
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    chi2 = float(((table - expected) ** 2 / expected).sum())
+    dof = (rows - 1) * (cols - 1)
+    cramers_v = math.sqrt(chi2 / (n * (min(rows, cols) - 1)))
+    return chi2, dof, chi2_sf(chi2, dof), cramers_v, n
+
+
+def rank_associations(tables):
+    """Rank factors from ``{factor: contingency table against the target}``.
+
+    Returns a frame sorted by Cramér's V, highest first.
+    """
+    rows = []
+    for column, table in tables.items():
+        chi2, dof, p_value, cramers_v, n = association(table)
+        rows.append({
+            'Factor': column,
+            "Cramér's V": cramers_v,
+            'Chi-square': chi2,
+            'dof': dof,
+            'p-value': p_value,
+            'n': n,
+        })
+    return pd.DataFrame(rows).sort_values("Cramér's V", ascending=False, ignore_index=True)
+
+
+def cramers_v_matrix(columns, tables):
+    """Symmetric Cramér's V matrix from ``{(a, b): table}`` for every pair in ``columns`` order."""
+    matrix = np.eye(len(columns))
+    for i, j in combinations(range(len(columns)), 2):
+        matrix[i, j] = matrix[j, i] = association(tables[(columns[i], columns[j])])[3]
+    return pd.DataFrame(matrix, index=columns, columns=columns)
+
+
+def severity_associations(df, target=SEVERITY_COLUMN, encoded=None):
+    """Rank every other column of ``df`` by its association with ``target``."""
+    encoded = encoded or encode_columns(df)
+    return rank_associations({
+        column: contingency(encoded[column], encoded[target])
+        for column in df.columns if column != target
+    })
+
+
+def pairwise_cramers_v(df, encoded=None):
+    """Symmetric Cramér's V matrix over every pair of columns of ``df``."""
+    encoded = encoded or encode_columns(df)
+    columns = list(df.columns)
+    return cramers_v_matrix(columns, {
+        (a, b): contingency(encoded[a], encoded[b]) for a, b in combinations(columns, 2)
+    })
+
+
+def association_tables(columns, tables, target=SEVERITY_COLUMN):
+    """``(ranked severity table, Cramér's V matrix)`` from precomputed pair tables.
+
+    ``tables`` maps every ``(a, b)`` pair of ``columns`` (in column order) to
+    its contingency table, e.g. as returned by a SQL backend.
+    """
+    against_target = {}
+    for column in columns:
+        if column != target:
+            pair = (column, target) if (column, target) in tables else (target, column)
+            against_target[column] = tables[pair]
+    return rank_associations(against_target), cramers_v_matrix(list(columns), tables)
@@ -0,0 +1,479 @@
+"""Pluggable query backends for the analysis pages.
+
+Usage::
+
+    python backends.py [--data student_df.csv] [--threads N]
+
+The pages ask a backend for the same small results -- crosstabs, quantiles,
+per-category aggregates under the sidebar filters -- and never touch rows
+themselves. ``pandas`` (the default) answers from the shared in-memory frame
+and its filter index. ``duckdb`` runs the queries as SQL over a Parquet copy
+of the CSV with the embedded DuckDB engine: only the referenced columns are
+read, the filters are pushed into the Parquet scan, the scan runs on all
+cores, and only aggregated rows come back, so the dataset never has to fit
+in the Streamlit process. Pick one with ``ACCIDENT_BACKEND=pandas|duckdb``.
+
+Run as a script, every query is answered by both backends under a set of
+filter combinations and the results are compared; the exit status is
+non-zero on any mismatch. test_backends.py runs the same comparison on
+student_df.csv under pytest.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from aggregates import AGGREGATE_COLUMNS, COUNT_PAIRS, VALUE_PAIRS, Aggregates, aggregate_frame, group_counts
+from association import association_tables, encode_columns, pairwise_cramers_v, severity_associations
+from dataset import CATEGORICAL_COLUMNS, DATA_PATH, file_hash, get_dataset, read_dataset
+from filters import Filters, filter_frame, get_index
+from incremental import get_incremental_state
+from instrumentation import timed
+from lru import LatestByKey
+from precompute import get_precomputed
+
+BACKEND_ENV = 'ACCIDENT_BACKEND'
+BACKENDS = ('pandas', 'duckdb')
+DEFAULT_BACKEND = 'pandas'
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+class PandasBackend:
+    """Queries answered from the shared in-memory :class:`dataset.Dataset`."""
+    name = 'pandas'
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.version = dataset.version
+        self.columns = list(dataset.frame.columns)
+
+    def frame(self, filters=Filters()):
+        return filter_frame(self.dataset, filters)
+
+    def rows(self, filters=Filters()):
+        return len(self.frame(filters))
+
+    def options(self, column):
+        return get_index(self.dataset).options(column)
+
+    def bounds(self, column):
+        return get_index(self.dataset).bounds(column)
+
+    def aggregates(self, filters=Filters()):
+        return aggregate_frame(self.frame(filters))
+
+    def pair_counts(self, pairs, filters=Filters()):
+        frame = self.frame(filters)
+        return {pair: group_counts(frame, pair) for pair in pairs}
+
+    def crosstab(self, x, y, filters=Filters()):
+        return group_counts(self.frame(filters), (x, y)).unstack(fill_value=0).sort_index().astype('int64')
+
+    def quantiles(self, group, value, quantiles=QUANTILES, filters=Filters()):
+        frame = self.frame(filters)
+        table = frame.groupby(group, observed=True)[value].quantile(list(quantiles)).unstack()
+        table = table.reindex(columns=list(quantiles))
+        table.index = table.index.astype(object)
+        return table.sort_index()
+
+    def associations(self, filters=Filters()):
+        frame = self.frame(filters)
+        encoded = encode_columns(frame)
+        return severity_associations(frame, encoded=encoded), pairwise_cramers_v(frame, encoded=encoded)
+
+
+# --- DuckDB over Parquet ---
+
+def sql_parquet_paths(path):
+    path = Path(path)
+    return path.with_name(f".{path.stem}.sql.parquet"), path.with_name(f".{path.stem}.sql.json")
+
+
+def build_sql_parquet(path=DATA_PATH, connection=None):
+    """Return ``(parquet path, dataset version)``, converting the CSV with DuckDB if needed.
+
+    The conversion streams the CSV through DuckDB, so it needs no more memory
+    than a few row groups. It is redone only when the CSV's size or content
+    hash changes.
+    """
+    import duckdb
+
+    parquet_path, meta_path = sql_parquet_paths(path)
+    stat = os.stat(path)
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        meta = {}
+    if parquet_path.exists() and meta.get('size') == stat.st_size:
+        if meta.get('mtime_ns') == stat.st_mtime_ns:
+            return parquet_path, meta['sha256'][:16]
+        digest = file_hash(path)
+        if meta.get('sha256') == digest:
+            return parquet_path, digest[:16]
+    else:
+        digest = file_hash(path)
+
+    con = connection or duckdb.connect()
+    # Pin the text columns: the CSV sniffer would read Yes/No columns as BOOLEAN.
+    types = ', '.join(f"'{column}': 'VARCHAR'" for column in CATEGORICAL_COLUMNS)
+    # Per-process temp names: several server processes may convert the same CSV.
+    tmp = parquet_path.with_name(f"{parquet_path.name}.tmp{os.getpid()}")
+    meta_tmp = meta_path.with_suffix(f'.tmp{os.getpid()}')
+    try:
+        con.execute(
+            f"COPY (SELECT * FROM read_csv({_literal(path)}, header = true, types = {{{types}}})) "
+            f"TO {_literal(tmp)} (FORMAT parquet, COMPRESSION zstd)"
+        )
+        os.replace(tmp, parquet_path)
+        meta_tmp.write_text(json.dumps({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}))
+        os.replace(meta_tmp, meta_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+        meta_tmp.unlink(missing_ok=True)
+    return parquet_path, digest[:16]
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _ident(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    """Queries run as SQL over a Parquet copy of the CSV."""
+    name = 'duckdb'
+
+    def __init__(self, path=DATA_PATH, threads=None):
+        try:
+            import duckdb
+        except ImportError as exc:
+            raise ImportError("the duckdb backend needs the 'duckdb' package (pip install duckdb)") from exc
+        self._con = duckdb.connect()
+        if threads:
+            self._con.execute(f"SET threads = {int(threads)}")
+        self.parquet_path, self.version = build_sql_parquet(path, self._con)
+        self._scan = f"read_parquet({_literal(self.parquet_path)}, file_row_number = true)"
+        schema = self._query(f"DESCRIBE SELECT * FROM read_parquet({_literal(self.parquet_path)})")
+        self.columns = list(schema['column_name'])
+        self._widget_choices = {}   # sidebar options / bounds, fixed for this file version
+
+    def _query(self, sql, params=()):
+        # One cursor per query: cursors share the database but are safe to
+        # use from different session threads at the same time.
+        with self._con.cursor() as cursor:
+            return cursor.execute(sql, list(params)).df()
+
+    def _where(self, filters, not_null=()):
+        clauses, params = [], []
+        for column, selected in filters.categories:
+            if column in self.columns:
+                clauses.append(f"{_ident(column)} IN ({', '.join('?' * len(selected))})")
+                params += [str(value) for value in selected]
+        for column, low, high in filters.ranges:
+            if column in self.columns:
+                clauses.append(f"{_ident(column)} BETWEEN ? AND ?")
+                params += [low, high]
+        clauses += [f"{_ident(column)} IS NOT NULL" for column in not_null]
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def rows(self, filters=Filters()):
+        where, params = self._where(filters)
+        return int(self._query(f"SELECT count(*) AS n FROM {self._scan}{where}", params)['n'].iloc[0])
+
+    def options(self, column):
+        key = ('options', column)
+        if key not in self._widget_choices:
+            where, params = self._where(Filters(), not_null=[column])
+            result = self._query(f"SELECT DISTINCT {_ident(column)} AS v FROM {self._scan}{where} ORDER BY v", params)
+            self._widget_choices[key] = list(result['v'])
+        return self._widget_choices[key]
+
+    def bounds(self, column):
+        key = ('bounds', column)
+        if key not in self._widget_choices:
+            where, params = self._where(Filters(), not_null=[column])
+            c = _ident(column)
+            low, high, whole = self._query(
+                f"SELECT min({c}) AS lo, max({c}) AS hi, bool_and({c} = floor({c})) AS whole "
+                f"FROM {self._scan}{where}", params
+            ).iloc[0]
+            self._widget_choices[key] = (int(low), int(high)) if whole else (float(low), float(high))
+        return self._widget_choices[key]
+
+    @timed('aggregate', 'sql grouping sets')
+    def grouping_sets(self, sets, filters=Filters(), first_row=False):
+        """Counts for several GROUP BY column sets in one scan.
+
+        Returns ``{set: frame of the set's columns plus 'count'}`` with rows
+        that are NULL in any of the set's columns left out; with
+        ``first_row`` each frame also has the ``first`` row number the
+        combination appears at.
+        """
+        columns = [c for c in self.columns if any(c in s for s in sets)]
+        names = ', '.join(_ident(c) for c in columns)
+        sets_sql = ', '.join('(' + ', '.join(_ident(c) for c in s) + ')' for s in sets)
+        where, params = self._where(filters)
+        # Collapse identical rows first, so each grouping set hashes distinct
+        # combinations rather than every row; with low-cardinality columns
+        # this roughly halves the cost of many sets.
+        inner_first = ', min(file_row_number) AS _first' if first_row else ''
+        outer_first = ', min(_first) AS _first' if first_row else ''
+        result = self._query(
+            f"SELECT GROUPING({names}) AS _set, {names}, sum(_n)::BIGINT AS _count{outer_first} "
+            f"FROM (SELECT {names}, count(*) AS _n{inner_first} FROM {self._scan}{where} GROUP BY ALL) "
+            f"GROUP BY GROUPING SETS ({sets_sql})", params
+        )
+        out = {}
+        for s in sets:
+            # GROUPING() sets the bit of every column *not* grouped in this set.
+            mask = sum(1 << (len(columns) - 1 - i) for i, c in enumerate(columns) if c not in s)
+            part = result[result['_set'] == mask].dropna(subset=list(s))
+            part = part[list(s) + ['_count'] + (['_first'] if first_row else [])]
+            out[s] = part.rename(columns={'_count': 'count', '_first': 'first'}).reset_index(drop=True)
+        return out
+
+    def pair_counts(self, pairs, filters=Filters()):
+        """``{pair: Series}`` shaped like :func:`aggregates.group_counts`."""
+        pairs = [tuple(pair) for pair in pairs]
+        return {pair: self._as_counts(part, pair) for pair, part in self.grouping_sets(pairs, filters).items()}
+
+    @staticmethod
+    def _as_counts(part, pair):
+        index = pd.MultiIndex.from_frame(part[list(pair)].astype(object) if part.empty else part[list(pair)])
+        return pd.Series(part['count'].to_numpy(dtype='int64'), index=index, name='count').sort_index()
+
+    def aggregates(self, filters=Filters()):
+        singles = [(column,) for column in AGGREGATE_COLUMNS if column in self.columns]
+        pairs = [pair for pair in COUNT_PAIRS + VALUE_PAIRS if set(pair) <= set(self.columns)]
+        results = self.grouping_sets(singles + pairs, filters, first_row=True)
+        order = {
+            column: tuple(results[(column,)].sort_values('first')[column])
+            for (column,) in singles
+        }
+        return Aggregates(
+            rows=self.rows(filters),
+            order=order,
+            pair_counts={pair: self._as_counts(results[pair], pair) for pair in COUNT_PAIRS if pair in results},
+            value_counts={pair: self._as_counts(results[pair], pair) for pair in VALUE_PAIRS if pair in results},
+        )
+
+    def crosstab(self, x, y, filters=Filters()):
+        counts = self.pair_counts([(x, y)], filters)[(x, y)]
+        return counts.unstack(fill_value=0).sort_index().astype('int64')
+
+    def quantiles(self, group, value, quantiles=QUANTILES, filters=Filters()):
+        where, params = self._where(filters, not_null=[group, value])
+        result = self._query(
+            f"SELECT {_ident(group)} AS g, quantile_cont({_ident(value)}, {list(map(float, quantiles))}) AS q "
+            f"FROM {self._scan}{where} GROUP BY g ORDER BY g", params
+        )
+        table = pd.DataFrame(result['q'].tolist(), index=pd.Index(result['g'], name=group, dtype=object),
+                             columns=list(quantiles))
+        table.columns.name = None
+        return table
+
+    def associations(self, filters=Filters()):
+        """Every pairwise contingency table from one grouping-sets scan."""
+        pairs = list(combinations(self.columns, 2))
+        counts = self.pair_counts(pairs, filters)
+        tables = {pair: counts[pair].unstack(fill_value=0).to_numpy() for pair in pairs}
+        return association_tables(self.columns, tables)
+
+
+# --- Backend selection ---
+
+def backend_name():
+    name = os.environ.get(BACKEND_ENV, DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"{BACKEND_ENV} must be one of {', '.join(BACKENDS)}, not {name!r}")
+    return name
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_backends():
+    return LatestByKey()
+
+
+def get_backend(path=DATA_PATH):
+    """The process-wide backend chosen by ``ACCIDENT_BACKEND``."""
+    if backend_name() == 'duckdb':
+        stat = os.stat(path)
+        return _shared_backends().get(str(path), (stat.st_mtime_ns, stat.st_size), lambda: DuckDBBackend(path))
+    return PandasBackend(get_dataset(path))
+
+
+def filter_source():
+    """What the sidebar widgets read their options and bounds from.
+
+    With the pandas backend that is the unfiltered aggregates, so drawing the
+    sidebar never loads the full frame; its filter index is built only once a
+    filter is applied.
+    """
+    if backend_name() == 'duckdb':
+        return get_backend()
+    return page_aggregates(Filters())[1]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+@timed('aggregate', 'filtered aggregates')
+def _filtered_aggregates(version, backend_name, filters, _backend):
+    return _backend.aggregates(filters)
+
+
+def page_aggregates(filters):
+    """Return ``(version, aggregates)`` for the analysis pages under ``filters``.
+
+    Unfiltered views are served from the precomputed artifact when it is
+    current; otherwise the pandas backend reads the incremental aggregator
+    (unfiltered) or the indexed frame, and the duckdb backend runs one
+    grouping-sets query. Filtered results are LRU-cached per filter tuple.
+    """
+    if not filters.active:
+        artifact = get_precomputed()
+        if artifact is not None:
+            return artifact.version, artifact.aggregates
+        if backend_name() == 'pandas':
+            state = get_incremental_state()
+            return state.version, state.aggregates
+    backend = get_backend()
+    return f"{backend.version}:{filters!r}", _filtered_aggregates(backend.version, backend.name, filters, backend)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+@timed('aggregate', 'associations')
+def _associations(version, backend_name, filters, _backend):
+    return _backend.associations(filters)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+@timed('aggregate', 'associations from pair counts')
+def _aggregate_associations(version, _aggregates):
+    return _aggregates.associations()
+
+
+def page_associations(filters):
+    """``(version, ranked severity table, all-pairs Cramér's V matrix)`` under ``filters``.
+
+    Unfiltered, the contingency tables come from the pair counts in the
+    precomputed artifact or, with the pandas backend, the incremental
+    aggregator, so the full frame is only loaded once a filter is applied.
+    """
+    if not filters.active:
+        artifact = get_precomputed()
+        if artifact is not None:
+            return (artifact.version, *_aggregate_associations(artifact.version, artifact.aggregates))
+        if backend_name() == 'pandas':
+            state = get_incremental_state()
+            return (state.version, *_aggregate_associations(state.version, state.aggregates))
+    backend = get_backend()
+    ranked, matrix = _associations(backend.version, backend.name, filters, backend)
+    return f"{backend.version}:{filters!r}", ranked, matrix
+
+
+# --- Backend comparison ---
+
+COMPARE_CASES = [
+    Filters(),
+    Filters(categories=(('Weather', ('Rainy',)),)),
+    Filters(categories=(('Road_Type', ('City Road', 'Highway')), ('Time_of_Day', ('Night',)))),
+    Filters(ranges=(('Biker_Age', 18.0, 25.0),)),
+    Filters(categories=(('Weather', ('Foggy',)),), ranges=(('Bike_Speed', 60.0, 90.0), ('Traffic_Density', 1.0, 2.0))),
+    Filters(ranges=(('Biker_Age', 1000.0, 2000.0),)),  # no rows
+]
+
+
+def _plain_counts(counts):
+    """Counts with numeric levels as floats, for comparing across backends."""
+    levels = [
+        level.astype(float) if pd.api.types.is_numeric_dtype(level) else level.astype(str)
+        for level in (counts.index.get_level_values(i) for i in range(counts.index.nlevels))
+    ]
+    plain = pd.Series(counts.to_numpy(dtype='int64'), index=pd.MultiIndex.from_arrays(levels))
+    return plain[plain > 0].sort_index()
+
+
+def _plain_values(values):
+    return [float(v) if isinstance(v, (int, float, np.number)) else str(v) for v in values]
+
+
+def _same_frame(a, b):
+    if a.shape != b.shape or list(map(str, a.index)) != list(map(str, b.index)):
+        return False
+    return bool(np.allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float), equal_nan=True))
+
+
+def compare_backends(reference, candidate, cases=COMPARE_CASES):
+    """Run every query on both backends; return a list of mismatch descriptions."""
+    problems = []
+
+    def check(what, ok):
+        if not ok:
+            problems.append(what)
+
+    check('version', reference.version == candidate.version)
+    for column in ('Road_Type', 'Weather', 'Time_of_Day'):
+        check(f"options {column}", list(map(str, reference.options(column))) == list(map(str, candidate.options(column))))
+    for column in ('Biker_Age', 'Bike_Speed', 'Traffic_Density'):
+        check(f"bounds {column}", reference.bounds(column) == candidate.bounds(column))
+
+    for filters in cases:
+        label = filters.describe() or 'no filters'
+        (ref_ranked, ref_matrix), (cand_ranked, cand_matrix) = reference.associations(filters), candidate.associations(filters)
+        ref_v = ref_ranked.set_index('Factor').sort_index()[["Cramér's V", 'Chi-square', 'dof', 'n']]
+        cand_v = cand_ranked.set_index('Factor').sort_index()[["Cramér's V", 'Chi-square', 'dof', 'n']]
+        check(f"[{label}] severity associations", _same_frame(ref_v, cand_v))
+        check(f"[{label}] Cramér's V matrix", _same_frame(ref_matrix, cand_matrix))
+        ref, cand = reference.aggregates(filters), candidate.aggregates(filters)
+        check(f"[{label}] rows", ref.rows == cand.rows == candidate.rows(filters))
+        for column, values in ref.order.items():
+            check(f"[{label}] order {column}", _plain_values(values) == _plain_values(cand.order.get(column, ())))
+        for kind in ('pair_counts', 'value_counts'):
+            for pair, counts in getattr(ref, kind).items():
+                other = getattr(cand, kind).get(pair)
+                check(f"[{label}] {kind} {pair}", other is not None and _plain_counts(counts).equals(_plain_counts(other)))
+        for x, y in COUNT_PAIRS:
+            check(f"[{label}] crosstab {x} x {y}", _same_frame(reference.crosstab(x, y, filters), candidate.crosstab(x, y, filters)))
+        for group, value in VALUE_PAIRS:
+            check(f"[{label}] quantiles {value} by {group}",
+                  _same_frame(reference.quantiles(group, value, filters=filters),
+                              candidate.quantiles(group, value, filters=filters)))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=str(DATA_PATH), help="source CSV (default: %(default)s)")
+    parser.add_argument('--threads', type=int, default=None, help="DuckDB threads (default: all cores)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    reference = PandasBackend(read_dataset(args.data))
+    candidate = DuckDBBackend(args.data, threads=args.threads)
+    print(f"Loaded both backends in {time.perf_counter() - started:.2f}s")
+
+    for backend in (reference, candidate):
+        started = time.perf_counter()
+        for filters in COMPARE_CASES:
+            backend.aggregates(filters)
+        print(f"{backend.name}: {len(COMPARE_CASES)} aggregate queries in {time.perf_counter() - started:.3f}s")
+
+    problems = compare_backends(reference, candidate)
+    if problems:
+        print("Backends disagree:\n  " + "\n  ".join(problems), file=sys.stderr)
+        return 1
+    print(f"pandas and duckdb agree on all {len(COMPARE_CASES)} filter combinations")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
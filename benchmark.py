@@ -0,0 +1,208 @@
+"""Headless performance benchmark for every page in the sidebar navigation.
+
+Usage::
+
+    python benchmark.py [--sizes 5k,100k,1m,10m] [--pages ...] [--out bench_results.json]
+                        [--budget budget.json] [--data-dir .bench]
+
+For each dataset size a synthetic CSV in student_df.csv's schema is generated
+(rows are resampled from the real file) and every page is run through
+Streamlit's AppTest harness in a fresh subprocess, served by sidebar.py as in
+the app (navigation, sidebar filters and per-stage timing included): once
+cold (empty in-process caches, on-disk caches removed) and once warm. Run
+time, peak RSS and the serialized Plotly payload are written to a JSON file,
+and the exit status is non-zero if any page exceeds its budget.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+SOURCE = ROOT / 'student_df.csv'
+ENTRY_POINT = 'sidebar.py'
+
+PAGES = [
+    'home.py',
+    'main.py',
+    'Accident Severity Analysis.py',
+    'Biker Data and Environmental exposure Analysis.py',
+]
+
+SIZES = {'5k': 5_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+DEFAULT_SIZES = '5k,100k,1m,10m'
+
+# Default per-page budgets by dataset size; a JSON file with the same shape
+# ({"<page>": {"<size>": {"<metric>": limit}}}, "*" matching any page or
+# size) can override them with --budget.
+DEFAULT_BUDGETS = {
+    '*': {
+        '5k': {'cold_s': 10, 'warm_s': 1, 'peak_rss_mb': 600, 'payload_bytes': 500_000},
+        # main.py ships every point as WebGL below charts.density_threshold() rows.
+        '100k': {'cold_s': 20, 'warm_s': 1, 'peak_rss_mb': 800, 'payload_bytes': 1_500_000},
+        '1m': {'cold_s': 60, 'warm_s': 2, 'peak_rss_mb': 1_500, 'payload_bytes': 1_000_000},
+        '10m': {'cold_s': 600, 'warm_s': 5, 'peak_rss_mb': 8_000, 'payload_bytes': 1_000_000},
+    },
+}
+
+GENERATE_CHUNK = 500_000
+
+
+def generate_dataset(rows, out, seed=0):
+    """Write ``rows`` rows resampled from student_df.csv to ``out`` in chunks."""
+    source = pd.read_csv(SOURCE)
+    rng = np.random.default_rng(seed)
+    tmp = Path(out).with_suffix('.tmp')
+    with open(tmp, 'w', newline='') as fh:
+        written = 0
+        while written < rows:
+            n = min(GENERATE_CHUNK, rows - written)
+            chunk = source.iloc[rng.integers(0, len(source), n)]
+            chunk.to_csv(fh, index=False, header=written == 0)
+            written += n
+    os.replace(tmp, out)
+
+
+def dataset_for(size, data_dir):
+    path = Path(data_dir) / f"accidents_{size}.csv"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        print(f"Generating {path} ({SIZES[size]:,} rows)...", flush=True)
+        generate_dataset(SIZES[size], path)
+    return path
+
+
+def clear_disk_caches(path):
+    """Remove the Parquet copies, column store and precompute artifact derived from ``path``."""
+    path = Path(path)
+    for name in (f".{path.stem}.parquet", f".{path.stem}.cache.json", f"{path.stem}.aggregates.npz",
+                 f".{path.stem}.sql.parquet", f".{path.stem}.sql.json"):
+        (path.parent / name).unlink(missing_ok=True)
+    shutil.rmtree(path.parent / f".{path.stem}.columns", ignore_errors=True)
+
+
+# --- Child process: run one page cold and warm ---
+
+def measure_page(page, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    result = {}
+    app = AppTest.from_file(str(ROOT / ENTRY_POINT), default_timeout=timeout)
+    # The page is reached through the navigation, so its runs include
+    # everything sidebar.py does around it.
+    app.switch_page(page)
+    for phase in ('cold', 'warm'):
+        started = time.perf_counter()
+        app.run()
+        result[f"{phase}_s"] = round(time.perf_counter() - started, 4)
+        if app.exception:
+            result['error'] = app.exception[0].value
+            break
+    result['payload_bytes'] = sum(len(chart.proto.spec) for chart in app.get('plotly_chart'))
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB.
+
+    Prefers VmHWM from /proc, because on Linux ru_maxrss survives fork+exec
+    and can report the parent's peak instead of the page's.
+    """
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1 << 20), 1)
+
+
+def run_page(page, data, timeout):
+    clear_disk_caches(data)
+    env = dict(os.environ, ACCIDENT_DATA=str(data))
+    proc = subprocess.run(
+        [sys.executable, __file__, '--child', page, '--timeout', str(timeout)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {'error': (proc.stderr.strip().splitlines() or ['page run failed'])[-1]}
+    return json.loads(lines[-1])
+
+
+# --- Budgets ---
+
+def budget_for(budgets, page, size):
+    limits = {}
+    for page_key in ('*', page):
+        limits.update(budgets.get(page_key, {}).get('*', {}))
+        limits.update(budgets.get(page_key, {}).get(size, {}))
+    return limits
+
+
+def check_budget(record, limits):
+    if 'error' in record:
+        return [f"error: {record['error']}"]
+    return [
+        f"{metric} {record[metric]} > {limit}"
+        for metric, limit in limits.items()
+        if metric in record and record[metric] > limit
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="comma-separated sizes from %s" % ', '.join(SIZES))
+    parser.add_argument('--pages', nargs='*', default=PAGES)
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--budget', help="JSON file overriding the default budgets")
+    parser.add_argument('--data-dir', default=str(ROOT / '.bench'))
+    parser.add_argument('--timeout', type=float, default=900)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_page(args.child, args.timeout)))
+        return 0
+
+    budgets = json.loads(json.dumps(DEFAULT_BUDGETS))
+    if args.budget:
+        for page, sizes in json.loads(Path(args.budget).read_text()).items():
+            for size, limits in sizes.items():
+                budgets.setdefault(page, {}).setdefault(size, {}).update(limits)
+
+    records = []
+    failures = []
+    for size in args.sizes.split(','):
+        data = dataset_for(size, args.data_dir)
+        for page in args.pages:
+            record = {'page': page, 'size': size, 'rows': SIZES[size], **run_page(page, data, args.timeout)}
+            violations = check_budget(record, budget_for(budgets, page, size))
+            record['violations'] = violations
+            records.append(record)
+            status = 'FAIL' if violations else 'ok'
+            print(f"[{status}] {size:>4} {page}: cold {record.get('cold_s')}s, warm {record.get('warm_s')}s, "
+                  f"rss {record.get('peak_rss_mb')} MB, payload {record.get('payload_bytes')} B", flush=True)
+            if violations:
+                failures.append(f"{size} {page}: {'; '.join(violations)}")
+
+    Path(args.out).write_text(json.dumps({'results': records, 'failures': failures}, indent=2))
+    if failures:
+        print("Budget exceeded:\n  " + "\n  ".join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,354 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from aggregates import weighted_quantiles
+from instrumentation import timed
+from sketch import KLLSketch, rank_error
+
+# --- Server-side aggregated charts ---
+# px.histogram / px.box serialize every row of the frame into the figure JSON
+# and leave the binning to the browser. The helpers below aggregate in pandas
+# first and hand Plotly only the finished bars and box statistics, so the
+# payload grows with the number of categories rather than the number of rows.
+
+COUNT_COLUMN = 'count'
+
+
+def appearance_order(series):
+    """Return the distinct values of ``series`` in order of first appearance.
+
+    This is the order px.histogram uses for axis categories and legend
+    entries when no ``category_orders`` are given.
+    """
+    return [value for value in pd.unique(series) if pd.notna(value)]
+
+
+def count_bar(table, x, color, category_orders=None, labels=None, **kwargs):
+    """Grouped bar chart from a long ``(x, color, count)`` table.
+
+    ``category_orders`` should give the order of both ``x`` and ``color``
+    values; see :func:`aggregate_count_bar` for the px.histogram-compatible
+    defaults.
+    """
+    # px.histogram always titles the y axis 'count' and ignores a 'count'
+    # label, so drop it here to keep the rendered chart unchanged.
+    labels = {key: value for key, value in (labels or {}).items() if key != COUNT_COLUMN}
+
+    table = table.copy()
+    for column in (x, color):
+        # Plain values keep the figure JSON identical to the histogram version.
+        table[column] = table[column].astype(object)
+
+    return px.bar(
+        table,
+        x=x,
+        y=COUNT_COLUMN,
+        color=color,
+        barmode='group',
+        category_orders=category_orders,
+        labels=labels,
+        **kwargs,
+    )
+
+
+def aggregate_count_bar(aggregates, x, color, category_orders=None, labels=None, **kwargs):
+    """Grouped bar chart of row counts, equivalent to ``px.histogram(barmode='group')``.
+
+    Counts come from :class:`aggregates.Aggregates`; axis and legend ordering
+    follow the same first-appearance rule as px.histogram unless
+    ``category_orders`` overrides them.
+    """
+    orders = {x: list(aggregates.order.get(x, ())), color: list(aggregates.order.get(color, ()))}
+    orders.update(category_orders or {})
+    table = aggregates.count_table(x, color)
+    return count_bar(table, x, color, category_orders=orders, labels=labels, **kwargs)
+
+
+# --- Box plots from precomputed statistics ---
+
+QUARTILES = (0.25, 0.5, 0.75)
+BOX_COLUMNS = ['count', 'q1', 'median', 'q3', 'lowerfence', 'upperfence', 'outliers']
+MAX_OUTLIERS = 200
+
+
+def _sample_outliers(outliers, max_outliers):
+    """Keep at most ``max_outliers`` values, evenly spaced so extremes survive."""
+    outliers = np.sort(outliers)
+    if outliers.size > max_outliers:
+        outliers = outliers[np.linspace(0, outliers.size - 1, max_outliers).round().astype(int)]
+    return outliers.tolist()
+
+
+def _box_row(values, q1, median, q3, max_outliers):
+    """Whiskers reach the most extreme ``values`` within 1.5 IQR, like Plotly's."""
+    iqr = q3 - q1
+    low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = values[(values >= low) & (values <= high)]
+    outside = values[(values < low) | (values > high)]
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': float(inside.min()) if inside.size else q1,
+        'upperfence': float(inside.max()) if inside.size else q3,
+        'outliers': _sample_outliers(outside, max_outliers),
+    }
+
+
+def aggregate_box_stats(aggregates, x, y, max_outliers=MAX_OUTLIERS):
+    """Exact per-group box statistics of ``y``, one row per ``x`` value.
+
+    Read from per-value counts in :class:`aggregates.Aggregates`. Groups are
+    in first-appearance order, matching px.box; outliers are the distinct
+    out-of-fence values (one marker per value).
+    """
+    per_group = aggregates.values(x, y)
+    rows = {}
+    for group, (values, counts) in per_group.items():
+        q1, median, q3 = weighted_quantiles(values, counts, QUARTILES)
+        rows[group] = {'count': int(counts.sum()), **_box_row(values, q1, median, q3, max_outliers)}
+    order = [group for group in aggregates.order.get(x, ()) if group in rows]
+    return pd.DataFrame.from_dict(rows, orient='index', columns=BOX_COLUMNS).loc[order]
+
+
+def sketch_box_stats(frames, x, y, k=200, max_outliers=MAX_OUTLIERS, seed=None):
+    """Approximate box statistics over an iterable of frames, e.g. CSV chunks.
+
+    Each group keeps a :class:`sketch.KLLSketch`, so memory is bounded no
+    matter how many rows stream through. Whiskers and outliers are taken
+    from the items the sketch retains. Returns ``(stats, sketches)``;
+    ``python sketch.py`` checks the result against the exact statistics.
+    """
+    sketches = {}
+    order = []
+    for frame in frames:
+        for group, values in frame.groupby(x, observed=True, sort=False)[y]:
+            if group not in sketches:
+                sketches[group] = KLLSketch(k=k, seed=seed)
+                order.append(group)
+            sketches[group].update(values.to_numpy(dtype=float))
+
+    rows = {}
+    for group in order:
+        sketch = sketches[group]
+        if sketch.count == 0:
+            continue
+        q1, median, q3 = sketch.quantile(QUARTILES)
+        retained = np.concatenate([sketch.retained(), [sketch.min, sketch.max]])
+        rows[group] = {'count': sketch.count, **_box_row(retained, q1, median, q3, max_outliers)}
+    stats = pd.DataFrame.from_dict(rows, orient='index', columns=BOX_COLUMNS)
+    return stats.loc[[group for group in order if group in rows]], sketches
+
+
+def sketch_accuracy(sketches, df, x, y, quantiles=QUARTILES):
+    """Report each group's sketch rank error against the exact data in ``df``.
+
+    Returns a frame with one row per group and one column per quantile; a
+    value of 0.01 means the estimate sits 1% of the group's rows away from
+    the true quantile.
+    """
+    errors = {}
+    for group, values in df.groupby(x, observed=True)[y]:
+        if group in sketches:
+            errors[group] = rank_error(sketches[group], values.to_numpy(dtype=float), quantiles)
+    return pd.DataFrame.from_dict(errors, orient='index', columns=[f"q{q:g}" for q in quantiles])
+
+
+def summary_box(stats, x, y, title=None, labels=None, color_discrete_sequence=None):
+    """Render :func:`aggregate_box_stats` output as a colour-per-group box plot like px.box.
+
+    Only the summary statistics and the bounded outlier sample are sent to
+    the browser.
+    """
+    labels = labels or {}
+    colors = color_discrete_sequence or px.colors.qualitative.Plotly
+    x_label = labels.get(x, x)
+    y_label = labels.get(y, y)
+
+    fig = go.Figure()
+    for i, (group, row) in enumerate(stats.iterrows()):
+        color = colors[i % len(colors)]
+        name = str(group)
+        fig.add_trace(go.Box(
+            name=name,
+            x=[name],
+            q1=[row['q1']],
+            median=[row['median']],
+            q3=[row['q3']],
+            lowerfence=[row['lowerfence']],
+            upperfence=[row['upperfence']],
+            marker_color=color,
+            legendgroup=name,
+        ))
+        if row['outliers']:
+            fig.add_trace(go.Scatter(
+                x=[name] * len(row['outliers']),
+                y=row['outliers'],
+                mode='markers',
+                marker=dict(color=color, size=6),
+                name=name,
+                legendgroup=name,
+                showlegend=False,
+                hovertemplate=f"{x_label}=%{{x}}<br>{y_label}=%{{y}}<extra></extra>",
+            ))
+
+    fig.update_layout(
+        title=title,
+        boxmode='overlay',
+        legend_title_text=x_label,
+        legend_tracegroupgap=0,
+        xaxis=dict(title=x_label, categoryorder='array', categoryarray=[str(g) for g in stats.index]),
+        yaxis=dict(title=y_label),
+    )
+    return fig
+
+
+# --- Scatter plots that scale with row count ---
+# Up to the WebGL row threshold the chart is a normal SVG px.scatter. Above
+# that it switches to WebGL (scattergl), and above the density threshold the
+# points are replaced by 2D bin counts, one colour layer per ``color`` value.
+# Both thresholds are row counts, set with ACCIDENT_WEBGL_ROWS and
+# ACCIDENT_DENSITY_ROWS (defaults below).
+
+WEBGL_ROWS_ENV = 'ACCIDENT_WEBGL_ROWS'
+DENSITY_ROWS_ENV = 'ACCIDENT_DENSITY_ROWS'
+WEBGL_THRESHOLD = 5_000
+DENSITY_THRESHOLD = 200_000
+DENSITY_BINS = 60
+
+
+def _row_threshold(env, default):
+    value = os.environ.get(env, '').strip()
+    if not value:
+        return default
+    try:
+        rows = int(value.replace('_', ''))
+    except ValueError:
+        rows = -1
+    if rows < 0:
+        raise ValueError(f"{env} must be a row count, not {value!r}")
+    return rows
+
+
+def webgl_threshold():
+    """Rows above which scatter plots render with WebGL."""
+    return _row_threshold(WEBGL_ROWS_ENV, WEBGL_THRESHOLD)
+
+
+def density_threshold():
+    """Rows above which scatter plots show binned counts instead of points."""
+    return _row_threshold(DENSITY_ROWS_ENV, DENSITY_THRESHOLD)
+
+
+def _bin_edges(values, bins):
+    low, high = float(np.nanmin(values)), float(np.nanmax(values))
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def binned_counts(df, x, y, color, bins=DENSITY_BINS):
+    """Count rows per (``color``, x bin, y bin) with a single np.bincount.
+
+    Returns a long frame with the bin centres and a ``count`` column; empty
+    bins are dropped. Colour values are in first-appearance order.
+    """
+    groups = appearance_order(df[color])
+    codes = pd.Categorical(df[color], categories=groups).codes.astype(np.int64)
+    xs = df[x].to_numpy(dtype=float)
+    ys = df[y].to_numpy(dtype=float)
+    valid = (codes >= 0) & ~np.isnan(xs) & ~np.isnan(ys)
+    codes, xs, ys = codes[valid], xs[valid], ys[valid]
+
+    x_edges, y_edges = _bin_edges(xs, bins), _bin_edges(ys, bins)
+    ix = np.clip(np.searchsorted(x_edges, xs, side='right') - 1, 0, bins - 1)
+    iy = np.clip(np.searchsorted(y_edges, ys, side='right') - 1, 0, bins - 1)
+    flat = np.bincount((codes * bins + ix) * bins + iy, minlength=len(groups) * bins * bins)
+
+    counts = flat.reshape(len(groups), bins, bins)
+    g, bx, by = np.nonzero(counts)
+    x_centres = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centres = (y_edges[:-1] + y_edges[1:]) / 2
+    return pd.DataFrame({
+        color: np.asarray(groups, dtype=object)[g],
+        x: x_centres[bx],
+        y: y_centres[by],
+        COUNT_COLUMN: counts[g, bx, by],
+    })
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+@timed('aggregate', 'binned counts')
+def cached_binned_counts(version, _df, x, y, color, bins=DENSITY_BINS):
+    """:func:`binned_counts` memoized per (dataset version, x, y, color, bins)."""
+    return binned_counts(_df, x, y, color, bins)
+
+
+def density_scatter(table, x, y, color, title=None, labels=None, opacity=None,
+                    color_discrete_sequence=None):
+    """Draw :func:`binned_counts` output with marker area proportional to count."""
+    labels = labels or {}
+    colors = color_discrete_sequence or px.colors.qualitative.Plotly
+    x_label, y_label = labels.get(x, x), labels.get(y, y)
+    color_label = labels.get(color, color)
+    sizeref = 2.0 * max(int(table[COUNT_COLUMN].max()), 1) / 30 ** 2 if len(table) else 1
+
+    fig = go.Figure()
+    for i, group in enumerate(appearance_order(table[color])):
+        layer = table[table[color] == group]
+        fig.add_trace(go.Scattergl(
+            x=layer[x],
+            y=layer[y],
+            mode='markers',
+            name=str(group),
+            customdata=layer[COUNT_COLUMN],
+            marker=dict(
+                color=colors[i % len(colors)],
+                size=layer[COUNT_COLUMN],
+                sizemode='area',
+                sizeref=sizeref,
+                sizemin=2,
+                opacity=opacity,
+            ),
+            hovertemplate=(
+                f"{color_label}={group}<br>{x_label}≈%{{x}}<br>{y_label}≈%{{y}}"
+                "<br>count=%{customdata}<extra></extra>"
+            ),
+        ))
+    fig.update_layout(
+        title=title,
+        legend_title_text=color_label,
+        xaxis_title=x_label,
+        yaxis_title=y_label,
+    )
+    return fig
+
+
+def scatter_chart(df, x, y, color, version=None, webgl_rows=None, density_rows=None, bins=DENSITY_BINS,
+                  binned=None, **kwargs):
+    """px.scatter that switches to WebGL and then to binned density as rows grow.
+
+    ``version`` identifies the dataset (see :class:`dataset.Dataset`) and keys
+    the bin-count cache; without it the bins are recomputed on every call.
+    ``binned`` may supply precomputed :func:`binned_counts` output. The row
+    thresholds default to :func:`webgl_threshold` and :func:`density_threshold`.
+    """
+    rows = len(df)
+    webgl_rows = webgl_threshold() if webgl_rows is None else webgl_rows
+    density_rows = density_threshold() if density_rows is None else density_rows
+    if rows > density_rows:
+        if binned is not None:
+            table = binned
+        elif version is None:
+            table = binned_counts(df, x, y, color, bins)
+        else:
+            table = cached_binned_counts(version, df, x, y, color, bins)
+        return density_scatter(table, x, y, color, **kwargs)
+
+    render_mode = 'webgl' if rows > webgl_rows else 'svg'
+    return px.scatter(df, x=x, y=y, color=color, render_mode=render_mode, **kwargs)
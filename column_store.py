@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# --- Memory-mapped shared column store ---
+# By default every server process parses the dataset once and shares the frame
+# between its sessions (st.cache_resource). With ACCIDENT_SHARED_DATA=mmap the
+# frames and filter-index arrays are instead written once per dataset version
+# as .npy files under ``.<stem>.columns/`` and memory-mapped read-only, so all
+# server processes on the host read the same page-cache pages and a process
+# holds no private copy of the data. The frames are built on the mapped arrays
+# without copying; like the in-memory frames, they must not be modified.
+
+SHARED_DATA_ENV = 'ACCIDENT_SHARED_DATA'
+MODES = ('process', 'mmap')
+
+
+def shared_mode():
+    mode = os.environ.get(SHARED_DATA_ENV, 'process').lower()
+    if mode not in MODES:
+        raise ValueError(f"{SHARED_DATA_ENV} must be one of {', '.join(MODES)}, not {mode!r}")
+    return mode
+
+
+def key_name(*parts):
+    """Short stable name for a store entry built from ``parts``."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:12]
+
+
+def store_path(source, version, name):
+    """Directory of entry ``name`` for version ``version`` of the CSV ``source``."""
+    source = Path(source)
+    return source.with_name(f".{source.stem}.columns") / f"{version}-{name}"
+
+
+def write_arrays(directory, arrays, meta):
+    """Write ``{name: ndarray}`` plus ``meta`` to ``directory`` atomically.
+
+    Another process may finish the same entry first; its copy is kept. Entries
+    of other dataset versions are removed, which is safe while they are still
+    mapped elsewhere.
+    """
+    directory = Path(directory)
+    tmp = directory.with_name(f"{directory.name}.tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        for name, values in arrays.items():
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(values), allow_pickle=False)
+        # meta.json is written last and marks the entry complete.
+        (tmp / 'meta.json').write_text(json.dumps(meta))
+        os.rename(tmp, directory)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not (directory / 'meta.json').exists():
+            raise
+    version = directory.name.split('-', 1)[0]
+    for sibling in directory.parent.iterdir():
+        if not sibling.name.startswith(version + '-') and '.tmp' not in sibling.name:
+            shutil.rmtree(sibling, ignore_errors=True)
+
+
+def map_arrays(directory):
+    """``(arrays, meta)`` memory-mapped from ``directory``, or ``None`` if it is incomplete."""
+    directory = Path(directory)
+    try:
+        meta = json.loads((directory / 'meta.json').read_text())
+    except (OSError, ValueError):
+        return None
+    # Plain read-only ndarray views of the mappings, so pandas and numpy
+    # results never carry the np.memmap subclass around.
+    arrays = {
+        path.stem: np.asarray(np.load(path, mmap_mode='r', allow_pickle=False))
+        for path in directory.glob('*.npy')
+    }
+    return arrays, meta
+
+
+def shared_arrays(directory, build):
+    """Map the entry at ``directory``, first writing ``build()``'s ``(arrays, meta)`` if needed."""
+    mapped = map_arrays(directory)
+    if mapped is None:
+        write_arrays(directory, *build())
+        mapped = map_arrays(directory)
+    return mapped
+
+
+# --- Frames ---
+
+def frame_arrays(frame, extra=None):
+    """Split ``frame`` into plain arrays: categorical codes plus categories in the metadata."""
+    arrays = {}
+    columns = []
+    for i, column in enumerate(frame.columns):
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[f"c{i}"] = series.cat.codes.to_numpy()
+            categories = series.cat.categories
+            columns.append({'name': column, 'categories': categories.tolist(),
+                            'categories_dtype': str(categories.dtype)})
+        else:
+            arrays[f"c{i}"] = series.to_numpy()
+            columns.append({'name': column})
+    return arrays, {'rows': len(frame), 'columns': columns, 'extra': extra}
+
+
+def frame_from_arrays(arrays, meta):
+    """Rebuild the frame from :func:`frame_arrays` output without copying the data."""
+    columns = {}
+    for i, spec in enumerate(meta['columns']):
+        values = arrays[f"c{i}"]
+        if 'categories' in spec:
+            categories = pd.Index(spec['categories'], dtype=spec['categories_dtype'])
+            values = pd.Categorical.from_codes(values, categories=categories)
+        columns[spec['name']] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def shared_frame(directory, build):
+    """``(frame, extra)`` mapped from ``directory``; ``build()`` returns ``(frame, extra)`` on a miss."""
+    def build_arrays():
+        frame, extra = build()
+        return frame_arrays(frame, extra)
+
+    arrays, meta = shared_arrays(directory, build_arrays)
+    return frame_from_arrays(arrays, meta), meta.get('extra')
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from column_store import shared_frame, shared_mode, store_path
+from instrumentation import timed
+from lru import LatestByKey
+
+# --- Shared data access for every analysis page ---
+# The CSV is parsed at most once per process and the resulting frame is shared
+# read-only by every session. A Parquet copy is kept next to the CSV so that a
+# fresh process can skip the CSV parse entirely; it is rebuilt only when the
+# CSV's modification time *and* content hash no longer match. With
+# ACCIDENT_SHARED_DATA=mmap the frame is memory-mapped from the column store
+# in column_store.py instead, so server processes share one copy of it.
+
+# ACCIDENT_DATA points the app at another CSV with the same schema, e.g. the
+# synthetic datasets generated by benchmark.py.
+DATA_PATH = Path(os.environ.get('ACCIDENT_DATA') or Path(__file__).with_name("student_df.csv"))
+
+# Low-cardinality text columns, stored as pandas categoricals.
+CATEGORICAL_COLUMNS = [
+    'Wearing_Helmet',
+    'Motorcycle_Ownership',
+    'Valid_Driving_License',
+    'Bike_Condition',
+    'Road_Type',
+    'Road_condition',
+    'Weather',
+    'Time_of_Day',
+    'Accident_Severity',
+]
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """A loaded dataset plus the content version it was built from."""
+    frame: pd.DataFrame
+    version: str
+    path: str
+
+
+def compact_frame(df):
+    """Return ``df`` with categorical text columns and the smallest numeric dtypes."""
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORICAL_COLUMNS or not pd.api.types.is_numeric_dtype(series):
+            df[column] = series.astype('category')
+        elif series.notna().all() and (series % 1 == 0).all():
+            df[column] = pd.to_numeric(series, downcast='integer')
+        else:
+            df[column] = pd.to_numeric(series, downcast='float')
+    return df
+
+
+def file_hash(path):
+    """Return the sha256 hex digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_paths(path):
+    path = Path(path)
+    return (
+        path.with_name(f".{path.stem}.parquet"),
+        path.with_name(f".{path.stem}.cache.json"),
+    )
+
+
+def _read_cache(path, mtime_ns):
+    """Return ``(frame, sha256)`` from the Parquet copy, or ``None`` if it is stale."""
+    parquet_path, meta_path = _cache_paths(path)
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if not parquet_path.exists():
+        return None
+
+    if meta.get('mtime_ns') != mtime_ns:
+        # The file was touched; only rebuild if its content actually changed.
+        digest = file_hash(path)
+        if meta.get('sha256') != digest:
+            return None
+        meta['mtime_ns'] = mtime_ns
+        _write_meta(meta_path, meta)
+
+    try:
+        frame = pd.read_parquet(parquet_path)
+    except (ImportError, OSError, ValueError):
+        return None
+    return frame, meta['sha256']
+
+
+def _write_meta(meta_path, meta):
+    """Replace the cache metadata. Failures only cost a rehash later."""
+    # Per-process temp names: several server processes may refresh the same cache.
+    tmp = meta_path.with_suffix(f'.tmp{os.getpid()}')
+    try:
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, meta_path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def _write_cache(path, frame, mtime_ns, digest):
+    """Store the compact frame next to the CSV. Failures only cost a reparse later."""
+    parquet_path, meta_path = _cache_paths(path)
+    tmp = parquet_path.with_suffix(f'.tmp{os.getpid()}')
+    try:
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, parquet_path)
+        _write_meta(meta_path, {'mtime_ns': mtime_ns, 'sha256': digest})
+    except (ImportError, OSError, ValueError):
+        tmp.unlink(missing_ok=True)
+
+
+@timed('load')
+def read_dataset(path=DATA_PATH):
+    """Load the dataset from the Parquet copy if current, otherwise from the CSV."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _read_cache(path, mtime_ns)
+    if cached is not None:
+        frame, digest = cached
+    else:
+        digest = file_hash(path)
+        frame = compact_frame(pd.read_csv(path))
+        _write_cache(path, frame, mtime_ns, digest)
+    return Dataset(frame=frame, version=digest[:16], path=str(path))
+
+
+@timed('load', 'mapped dataset')
+def map_dataset(path=DATA_PATH):
+    """Load the dataset memory-mapped from the shared column store, writing it on first use."""
+    version = file_hash(path)[:16]
+    frame, _ = shared_frame(store_path(path, version, 'dataset'),
+                            lambda: (read_dataset(path).frame, None))
+    return Dataset(frame=frame, version=version, path=str(path))
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_datasets():
+    return LatestByKey()
+
+
+def _load_shared(path):
+    if shared_mode() == 'mmap':
+        return map_dataset(path)
+    return read_dataset(path)
+
+
+def get_dataset(path=DATA_PATH):
+    """Return the process-wide shared :class:`Dataset` for ``path``.
+
+    The returned frame is shared by every session and must not be modified;
+    take a ``.copy()`` first if a page needs to add columns.
+    """
+    # The stat values are the entry's version, so an edited CSV is picked up
+    # on the next rerun and replaces the copy, while an unchanged file keeps
+    # hitting it.
+    stat = os.stat(path)
+    return _shared_datasets().get(str(path), (stat.st_mtime_ns, stat.st_size), lambda: _load_shared(path))
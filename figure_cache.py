@@ -0,0 +1,49 @@
+import plotly.io as pio
+import streamlit as st
+
+from instrumentation import stage
+from lru import BytesLRU
+
+# --- Cross-session figure cache ---
+# For a given dataset version and filter state every user sees the same
+# figures, so the serialized figure JSON is kept in one process-wide LRU cache
+# with a memory budget. A hit skips both the aggregation and the px.* figure
+# construction; only the JSON is parsed back into a Figure.
+
+MAX_BYTES = 64 << 20
+
+
+class FigureCache(BytesLRU):
+    """Thread-safe LRU of figure JSON strings bounded by total size in bytes."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        super().__init__(max_bytes)
+
+    def figure(self, key, build):
+        """Return the figure for ``key``, calling ``build()`` only on a miss."""
+        label = key[-1] if isinstance(key, tuple) else str(key)
+        payload = self.get(key)
+        if payload is not None:
+            with stage('serialize', f"{label} (from cache)"):
+                return pio.from_json(payload, skip_invalid=True)
+        with stage('figure', label):
+            fig = build()
+        with stage('serialize', f"{label} (to cache)"):
+            self.put(key, fig.to_json())
+        return fig
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache(max_bytes=MAX_BYTES):
+    """The process-wide :class:`FigureCache` shared by every session."""
+    return FigureCache(max_bytes)
+
+
+def cached_figure(version, spec, build):
+    """Shared-cache lookup of the figure ``spec`` for data identified by ``version``.
+
+    ``version`` must identify both the dataset and the filters (the pages
+    pass their ``data_version``); ``spec`` names the chart and must change
+    whenever its options do.
+    """
+    return get_figure_cache().figure((version, spec), build)
@@ -0,0 +1,189 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from column_store import key_name, shared_arrays, shared_mode, store_path
+from instrumentation import timed
+from lru import LatestByKey
+
+# --- Global cross-filters ---
+# The sidebar filters apply to every analysis page. They are answered from a
+# precomputed index instead of re-scanning the frame: one boolean mask per
+# category value, and a sorted copy (plus argsort order) of each numeric
+# column so a range becomes two binary searches. A filter combination is the
+# intersection of those masks. Queries under a filter combination go through
+# the backends in backends.py.
+
+CATEGORY_FILTERS = {
+    'Road_Type': 'Road Type',
+    'Weather': 'Weather',
+    'Time_of_Day': 'Time of Day',
+}
+
+RANGE_FILTERS = {
+    'Biker_Age': 'Biker Age',
+    'Bike_Speed': 'Bike Speed',
+    'Traffic_Density': 'Traffic Density',
+}
+
+SESSION_KEY = 'filters'
+
+
+@dataclass(frozen=True)
+class Filters:
+    """Active filters as hashable tuples; unset filters are left out."""
+    categories: tuple = ()  # ((column, (value, ...)), ...)
+    ranges: tuple = ()      # ((column, low, high), ...)
+
+    @property
+    def active(self):
+        return bool(self.categories or self.ranges)
+
+    def describe(self):
+        parts = [f"{CATEGORY_FILTERS.get(c, c)}: {', '.join(map(str, v))}" for c, v in self.categories]
+        parts += [f"{RANGE_FILTERS.get(c, c)}: {lo:g}–{hi:g}" for c, lo, hi in self.ranges]
+        return '; '.join(parts)
+
+
+class FilterIndex:
+    """Per-value masks and sorted numeric columns for one frame."""
+
+    def __init__(self, df):
+        self.rows = len(df)
+        self.masks = {}
+        for column in CATEGORY_FILTERS:
+            if column in df:
+                codes = pd.Categorical(df[column])
+                self.masks[column] = {
+                    value: codes.codes == i for i, value in enumerate(codes.categories)
+                }
+        self.sorted = {}
+        for column in RANGE_FILTERS:
+            if column in df:
+                values = df[column].to_numpy(dtype=float)
+                order = np.argsort(values, kind='stable')
+                self.sorted[column] = (values[order], order)
+
+    def to_arrays(self):
+        """``(arrays, meta)`` for :mod:`column_store`: one 2-D mask array per category column."""
+        arrays = {}
+        meta = {'rows': self.rows, 'masks': {}, 'sorted': list(self.sorted)}
+        for i, (column, value_masks) in enumerate(self.masks.items()):
+            meta['masks'][column] = list(value_masks)
+            arrays[f"mask{i}"] = np.stack(list(value_masks.values())) if value_masks else np.zeros((0, self.rows), bool)
+        for i, (values, order) in enumerate(self.sorted.values()):
+            arrays[f"values{i}"] = values
+            arrays[f"order{i}"] = order
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """Index over :meth:`to_arrays` output, e.g. memory-mapped from the shared store."""
+        index = cls.__new__(cls)
+        index.rows = meta['rows']
+        index.masks = {
+            column: dict(zip(values, arrays[f"mask{i}"]))
+            for i, (column, values) in enumerate(meta['masks'].items())
+        }
+        index.sorted = {
+            column: (arrays[f"values{i}"], arrays[f"order{i}"])
+            for i, column in enumerate(meta['sorted'])
+        }
+        return index
+
+    def options(self, column):
+        return list(self.masks.get(column, {}))
+
+    def bounds(self, column):
+        """``(min, max)`` of a numeric column, as ints when every value is whole."""
+        values, _ = self.sorted[column]
+        low, high = values[0], values[-1]
+        if np.all(values == np.round(values)):
+            return int(low), int(high)
+        return float(low), float(high)
+
+    def mask(self, filters):
+        """Boolean row mask for ``filters``; columns the frame lacks are ignored."""
+        mask = np.ones(self.rows, dtype=bool)
+        for column, selected in filters.categories:
+            if column in self.masks:
+                value_masks = self.masks[column]
+                either = np.zeros(self.rows, dtype=bool)
+                for value in selected:
+                    if value in value_masks:
+                        either |= value_masks[value]
+                mask &= either
+        for column, low, high in filters.ranges:
+            if column in self.sorted:
+                values, order = self.sorted[column]
+                start = np.searchsorted(values, low, side='left')
+                stop = np.searchsorted(values, high, side='right')
+                in_range = np.zeros(self.rows, dtype=bool)
+                in_range[order[start:stop]] = True
+                mask &= in_range
+        return mask
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_indexes():
+    return LatestByKey()
+
+
+@timed('aggregate', 'filter index')
+def _build_index(version, columns, df, path=None):
+    if path is not None and shared_mode() == 'mmap':
+        directory = store_path(path, version, 'index-' + key_name(columns))
+        return FilterIndex.from_arrays(*shared_arrays(directory, lambda: FilterIndex(df).to_arrays()))
+    return FilterIndex(df)
+
+
+def get_index(dataset):
+    """Shared :class:`FilterIndex` for a :class:`dataset.Dataset`.
+
+    With ``ACCIDENT_SHARED_DATA=mmap`` the index arrays are memory-mapped from
+    the shared column store, like the dataset itself. One index is kept per
+    dataset path and columns; a new dataset version replaces it.
+    """
+    columns = tuple(dataset.frame.columns)
+    return _shared_indexes().get(
+        (dataset.path, columns), dataset.version,
+        lambda: _build_index(dataset.version, columns, dataset.frame, dataset.path),
+    )
+
+
+def filter_frame(dataset, filters):
+    """Rows of ``dataset.frame`` that match ``filters``."""
+    if not filters.active:
+        return dataset.frame
+    return dataset.frame[get_index(dataset).mask(filters)]
+
+
+def current_filters():
+    """Filters chosen in the sidebar for this session."""
+    return st.session_state.get(SESSION_KEY, Filters())
+
+
+def render_sidebar_filters(index):
+    """Draw the global filter widgets and store the result in session state.
+
+    ``index`` supplies the widget choices through ``options(column)`` and
+    ``bounds(column)``: a :class:`FilterIndex`, or a query backend.
+    """
+    categories = []
+    ranges = []
+    with st.sidebar:
+        st.header("Filters")
+        for column, label in CATEGORY_FILTERS.items():
+            selected = st.multiselect(label, index.options(column), key=f"filter_{column}", placeholder="All")
+            if selected and len(selected) < len(index.options(column)):
+                categories.append((column, tuple(sorted(selected))))
+        for column, label in RANGE_FILTERS.items():
+            low, high = index.bounds(column)
+            chosen = st.slider(label, low, high, (low, high), key=f"filter_{column}")
+            if chosen != (low, high):
+                ranges.append((column, float(chosen[0]), float(chosen[1])))
+    filters = Filters(categories=tuple(categories), ranges=tuple(ranges))
+    st.session_state[SESSION_KEY] = filters
+    return filters
@@ -1,8 +1,13 @@
 import streamlit as st
 
+from assets import show_image
+
+# Banner images are served from the local assets/ folder, pre-resized to the
+# page width, so the Homepage renders without any network access; one missing
+# from assets/ is shown from its original URL instead (see assets.py).
+
 # Add a banner image at the top
-banner_image = 'https://raw.githubusercontent.com/fakhitah3/FHPK-TVET/main/3u1i.jpeg'
-st.image(banner_image, use_container_width=True)
+show_image('3u1i.jpeg', use_container_width=True)
 
 # Add the main introduction paragraph
 st.write(
@@ -12,8 +17,7 @@ st.write(
     """
 )
 
-banner_image = 'https://raw.githubusercontent.com/fakhitah3/FHPK-TVET/main/3u1i_2.jpeg'
-st.image(banner_image, use_container_width=True)
+show_image('3u1i_2.jpeg', use_container_width=True)
 
 # Add the extended explanation
 st.write(
@@ -0,0 +1,180 @@
+import csv
+import hashlib
+import io
+import os
+import threading
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from aggregates import Aggregates, aggregate_frame
+from dataset import DATA_PATH
+from instrumentation import timed
+
+# --- Incremental, append-only aggregate refresh ---
+# New accident rows are appended to the CSV while the app runs. Instead of
+# re-reading the file, the aggregator remembers the byte offset of the last
+# complete line it ingested and, on refresh, parses only the bytes after it
+# and merges their counts into the cached aggregates. The ingested prefix is
+# fingerprinted as one digest per CHECK_BYTES block. A file that shrank, that
+# was modified without growing, or whose grown prefix no longer matches the
+# blocks checked on refresh was rewritten rather than appended to, which
+# triggers a full rebuild.
+# Bytes after the last newline are either a write in progress or a final line
+# without a terminator. They are never ingested, and only counted in the
+# snapshot once the file has kept the same size and mtime across two refreshes
+# and they hold a full record: a writer that is still going would otherwise
+# add a truncated last value (e.g. a clipped Accident_Severity) as a category.
+
+BLOCK_BYTES = 8 << 20   # bytes parsed per step, bounding peak memory
+CHECK_BYTES = 64 << 10  # size of the prefix blocks fingerprinted for change detection
+CHECK_BLOCKS = 8        # blocks re-read per refresh of a grown file, besides the first and last
+
+
+@dataclass(frozen=True)
+class IncrementalState:
+    """Immutable snapshot handed to the pages after each refresh."""
+    aggregates: Aggregates
+    version: str
+    offset: int
+    rebuilds: int
+
+
+class IncrementalAggregator:
+    """Keeps :class:`aggregates.Aggregates` for a CSV that only grows at the end."""
+
+    def __init__(self, path=DATA_PATH, block_bytes=BLOCK_BYTES):
+        self.path = str(path)
+        self.block_bytes = block_bytes
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._header = b''
+        self._fields = 0
+        self._tail = b''
+        self._offset = 0
+        self._size = self._mtime_ns = None   # file stat at the last refresh
+        self._blocks = []      # sha1 of each whole CHECK_BYTES block of the ingested prefix
+        self._partial = b''    # ingested bytes after the last whole block
+        self._cursor = 0       # next block to re-check, rotating
+        self._settled = False  # the snapshot reflects a decision on the current tail
+        self._digest = hashlib.sha256()
+        self._aggregates = Aggregates()
+        self._state = None
+
+    def _prefix_unchanged(self, fh, stat):
+        if not self._header or stat.st_size < self._size:
+            return False
+        if stat.st_size == self._size:
+            # Written to without growing: an in-place edit.
+            return stat.st_mtime_ns == self._mtime_ns
+        # Grown: re-check the first and last blocks plus CHECK_BLOCKS more in
+        # rotation, so a run of appends eventually re-reads the whole prefix.
+        n = len(self._blocks)
+        picks = {0, n - 1} | {(self._cursor + i) % n for i in range(CHECK_BLOCKS)} if n else set()
+        self._cursor = (self._cursor + CHECK_BLOCKS) % n if n else 0
+        for i in sorted(picks):
+            fh.seek(i * CHECK_BYTES)
+            if hashlib.sha1(fh.read(CHECK_BYTES)).digest() != self._blocks[i]:
+                return False
+        fh.seek(n * CHECK_BYTES)
+        return fh.read(len(self._partial)) == self._partial
+
+    def _record(self, data):
+        """Account for ``data`` ingested at the current offset."""
+        self._digest.update(data)
+        self._offset += len(data)
+        partial = self._partial + data
+        whole = len(partial) - len(partial) % CHECK_BYTES
+        for start in range(0, whole, CHECK_BYTES):
+            self._blocks.append(hashlib.sha1(partial[start:start + CHECK_BYTES]).digest())
+        self._partial = partial[whole:]
+
+    def _ingest(self, fh):
+        """Parse every complete line from the current offset to EOF."""
+        fh.seek(self._offset)
+        pending = b''
+        parts = []
+        while True:
+            block = fh.read(self.block_bytes)
+            if not block:
+                break
+            pending += block
+            cut = pending.rfind(b'\n') + 1
+            if cut == 0:
+                continue
+            lines, pending = pending[:cut], pending[cut:]
+            parts.append(self._parse(lines))
+            self._record(lines)
+        self._aggregates = self._aggregates.merge(*parts)
+        self._tail = pending
+
+    def _parse(self, lines):
+        # Every column: the pair counts behind the severity associations need them all.
+        frame = pd.read_csv(io.BytesIO(self._header + lines))
+        return aggregate_frame(frame, tables=True)
+
+    def _is_record(self, line):
+        """True if ``line`` has as many fields as the header."""
+        fields = next(csv.reader([line.decode('utf-8', 'replace').rstrip('\r')]), [])
+        return len(fields) == self._fields
+
+    def _rebuild(self, fh):
+        self._clear()
+        self.rebuilds += 1
+        fh.seek(0)
+        header = fh.readline()
+        if not header.endswith(b'\n'):
+            return
+        self._header = header
+        self._fields = len(next(csv.reader([header.decode('utf-8', 'replace').rstrip('\r\n')])))
+        self._record(header)
+        self._ingest(fh)
+
+    @timed('load')
+    def refresh(self):
+        """Bring the aggregates up to date with the file and return a snapshot.
+
+        Cost is proportional to the bytes appended since the last call plus
+        a few prefix blocks re-checked; an unchanged file costs one ``stat``.
+        """
+        with self._lock:
+            with open(self.path, 'rb') as fh:
+                stat = os.fstat(fh.fileno())
+                # Same size as last time; with an unchanged prefix that also
+                # means the same mtime, so any tail has stopped growing.
+                stable = stat.st_size == self._size
+                if not self._prefix_unchanged(fh, stat):
+                    self._rebuild(fh)
+                    stable = False
+                elif stable and self._settled:
+                    return self._state
+                elif not stable:
+                    self._ingest(fh)
+                self._size, self._mtime_ns = stat.st_size, stat.st_mtime_ns
+            aggregates, digest = self._aggregates, self._digest
+            self._settled = stable or not self._tail
+            if self._tail and stable and self._is_record(self._tail):
+                aggregates = aggregates.merge(self._parse(self._tail))
+                digest = digest.copy()
+                digest.update(self._tail)
+            self._state = IncrementalState(
+                aggregates=aggregates,
+                version=digest.hexdigest()[:16],
+                offset=self._offset,
+                rebuilds=self.rebuilds,
+            )
+            return self._state
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_aggregator(path):
+    return IncrementalAggregator(path)
+
+
+def get_incremental_state(path=DATA_PATH):
+    """Refresh the process-wide aggregator for ``path`` and return its snapshot."""
+    return _shared_aggregator(str(path)).refresh()
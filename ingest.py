@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+from dataclasses import asdict, dataclass, fields
+
+import pandas as pd
+import streamlit as st
+from pandas.api.types import union_categoricals
+
+from column_store import key_name, shared_frame, shared_mode, store_path
+from dataset import CATEGORICAL_COLUMNS, DATA_PATH, Dataset, compact_frame, file_hash
+from instrumentation import timed
+from lru import LatestByKey
+
+# --- Chunked, streaming ingest ---
+# Reads the accident CSV in fixed-size chunks, validates and downcasts each
+# chunk, and keeps only the requested columns. Peak memory is one raw chunk
+# plus the compact columns accumulated so far, so large exports never have to
+# be held in memory as a fully parsed (object-dtype) frame.
+
+CHUNK_ROWS = 100_000
+
+
+@dataclass(frozen=True)
+class IngestReport:
+    """Row counts collected while streaming the file."""
+    rows_read: int
+    rows_dropped: int
+    chunks: int
+
+
+class _HashingReader(io.RawIOBase):
+    """Raw file wrapper that hashes bytes as they are read."""
+
+    def __init__(self, fh):
+        self._fh = fh
+        self.digest = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._fh.readinto(buffer)
+        self.digest.update(memoryview(buffer)[:n])
+        return n
+
+
+def validate_chunk(chunk):
+    """Coerce types and drop rows that are missing or out of range.
+
+    Numeric columns must parse as non-negative numbers and categorical columns
+    must be non-empty. Returns ``(clean_chunk, dropped_row_count)``.
+    """
+    valid = pd.Series(True, index=chunk.index)
+    for column in chunk.columns:
+        if column in CATEGORICAL_COLUMNS:
+            values = chunk[column].astype('string').str.strip()
+            valid &= values.notna() & (values != '')
+        else:
+            values = pd.to_numeric(chunk[column], errors='coerce')
+            valid &= values.notna() & (values >= 0)
+        chunk[column] = values
+    clean = chunk[valid]
+    return compact_frame(clean), int((~valid).sum())
+
+
+def _concat(chunks, columns):
+    """Concatenate compact chunks, unioning categories instead of falling back to object."""
+    if not chunks:
+        return compact_frame(pd.DataFrame({column: pd.Series(dtype='object') for column in columns}))
+    frame = {}
+    for column in columns:
+        parts = [chunk[column] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            frame[column] = pd.Series(union_categoricals([p.values for p in parts]), name=column)
+        else:
+            frame[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(frame)
+
+
+@timed('load')
+def stream_dataset(path=DATA_PATH, columns=None, chunk_rows=CHUNK_ROWS):
+    """Stream ``path`` in ``chunk_rows`` chunks, keeping only ``columns``.
+
+    Returns ``(Dataset, IngestReport)``. The dataset version is the sha256
+    of the file bytes, computed during the same read, so it matches the
+    versions produced by :func:`dataset.read_dataset`.
+    """
+    chunks = []
+    rows_read = rows_dropped = n_chunks = 0
+
+    with open(path, 'rb') as fh:
+        reader = _HashingReader(fh)
+        buffered = io.BufferedReader(reader, buffer_size=1 << 20)
+        for chunk in pd.read_csv(buffered, usecols=columns, chunksize=chunk_rows, dtype=str):
+            n_chunks += 1
+            rows_read += len(chunk)
+            clean, dropped = validate_chunk(chunk)
+            rows_dropped += dropped
+            chunks.append(clean)
+        # Hash anything pandas did not need to read (e.g. a trailing newline).
+        while buffered.read(1 << 20):
+            pass
+
+    frame = _concat(chunks, columns or (list(chunks[0].columns) if chunks else []))
+    report = IngestReport(
+        rows_read=rows_read,
+        rows_dropped=rows_dropped,
+        chunks=n_chunks,
+    )
+    dataset = Dataset(frame=frame, version=reader.digest.hexdigest()[:16], path=str(path))
+    return dataset, report
+
+
+def map_streamed_dataset(path=DATA_PATH, columns=None, chunk_rows=CHUNK_ROWS):
+    """:func:`stream_dataset` result memory-mapped from the shared column store."""
+    version = file_hash(path)[:16]
+
+    def build():
+        dataset, report = stream_dataset(path, columns, chunk_rows)
+        return dataset.frame, asdict(report)
+
+    directory = store_path(path, version, 'stream-' + key_name(columns, chunk_rows))
+    frame, report = shared_frame(directory, build)
+    # Stores written by older versions may carry fields the report no longer has.
+    report = {field.name: report[field.name] for field in fields(IngestReport)}
+    return Dataset(frame=frame, version=version, path=str(path)), IngestReport(**report)
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_streams():
+    return LatestByKey()
+
+
+def _load_stream(path, columns, chunk_rows):
+    columns = list(columns) if columns is not None else None
+    if shared_mode() == 'mmap':
+        return map_streamed_dataset(path, columns, chunk_rows)
+    return stream_dataset(path, columns, chunk_rows)
+
+
+def get_streamed_dataset(path=DATA_PATH, columns=None, chunk_rows=CHUNK_ROWS):
+    """Process-wide shared :func:`stream_dataset` result, refreshed when the file changes."""
+    stat = os.stat(path)
+    columns = tuple(columns) if columns is not None else None
+    return _shared_streams().get((str(path), columns, chunk_rows), (stat.st_mtime_ns, stat.st_size),
+                                 lambda: _load_stream(path, columns, chunk_rows))
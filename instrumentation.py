@@ -0,0 +1,304 @@
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import streamlit as st
+
+# --- Per-rerun stage timings ---
+# sidebar.py wraps every script run in ``profiled_rerun``. Inside it, page code
+# marks its hot paths with ``with stage('load'): ...`` and library functions
+# with ``@timed('aggregate')``; each stage records its wall time. When the run
+# ends one JSON line per rerun is appended to a size-rotated log file.
+#
+# With the developer panel or ACCIDENT_TRACE_MEMORY=1, the rerun also runs
+# under tracemalloc, which sees NumPy and pandas buffers as well as Python
+# objects: each stage records the bytes it left allocated and its peak above
+# the memory in use when it started. Tracing slows allocations down, so it is
+# off otherwise, and it is process-wide: reruns of other sessions running at
+# the same time are counted too, and share the peak counter.
+#
+# Outside a profiled rerun (precompute workers, the benchmark's single-page
+# runs) ``stage`` and ``timed`` only check a thread-local and return.
+
+STAGES = ('load', 'aggregate', 'figure', 'serialize')
+
+# ACCIDENT_TIMINGS_LOG moves the log; set it to an empty string to turn it off.
+LOG_PATH = os.environ.get('ACCIDENT_TIMINGS_LOG', str(Path(__file__).with_name('timings.log')))
+LOG_MAX_BYTES = 5 << 20
+LOG_BACKUPS = 3
+
+# The developer panel is shown with ACCIDENT_DEV_PANEL=1 or ``?dev=1`` in the URL.
+PANEL_ENV = 'ACCIDENT_DEV_PANEL'
+PANEL_QUERY_PARAM = 'dev'
+
+# Traces memory in every rerun, without the panel.
+TRACE_MEMORY_ENV = 'ACCIDENT_TRACE_MEMORY'
+
+_local = threading.local()
+_logger_lock = threading.Lock()
+
+
+class RerunTimings:
+    """Stages recorded during one script run, in the order they finished."""
+
+    def __init__(self, page, traced=False):
+        self.page = page
+        self.stages = []
+        self.depth = 0
+        self.traced = traced
+        if traced:
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            self.memory = current
+            # Running peak of the rerun and of each open stage, innermost last.
+            self.peaks = [current]
+        self.started = time.perf_counter()
+
+    def enter_memory(self):
+        """Start measuring a stage; returns the traced bytes in use."""
+        current, peak = tracemalloc.get_traced_memory()
+        self.peaks[-1] = max(self.peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self.peaks.append(current)
+        return current
+
+    def exit_memory(self, start):
+        """Finish the innermost stage; returns ``(net bytes, peak bytes)`` above ``start``."""
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(self.peaks.pop(), peak)
+        self.peaks[-1] = max(self.peaks[-1], peak)
+        return current - start, peak - start
+
+    def record(self, name, label, depth, start, seconds, memory=(None, None)):
+        self.stages.append({
+            'stage': name,
+            'label': label,
+            'depth': depth,
+            'start': round(start, 6),   # seconds since the rerun started
+            'seconds': round(seconds, 6),
+            'net_bytes': memory[0],     # traced bytes still allocated when the stage ended
+            'peak_bytes': memory[1],    # highest traced bytes in use above the stage's start
+        })
+
+    def totals(self):
+        """Seconds per stage name, counting only the outermost stage of each name."""
+        totals = dict.fromkeys(STAGES, 0.0)
+        open_names = []
+        # Stages are appended when they finish, so walk them in start order.
+        for entry in sorted(self.stages, key=lambda e: e['start']):
+            while open_names and open_names[-1][1] <= entry['start']:
+                open_names.pop()
+            if all(name != entry['stage'] for name, _ in open_names):
+                totals[entry['stage']] = totals.get(entry['stage'], 0.0) + entry['seconds']
+            open_names.append((entry['stage'], entry['start'] + entry['seconds']))
+        return {name: round(seconds, 6) for name, seconds in totals.items()}
+
+    def summary(self, status):
+        net = peak = None
+        if self.traced:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            net, peak = current - self.memory, max(self.peaks[0], traced_peak) - self.memory
+        return {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'page': self.page,
+            'session': _session_id(),
+            'status': status,
+            'seconds': round(time.perf_counter() - self.started, 6),
+            'net_bytes': net,
+            'peak_bytes': peak,
+            'totals': self.totals(),
+            'stages': self.stages,
+        }
+
+
+def current_timings():
+    """The :class:`RerunTimings` of the script run on this thread, or ``None``."""
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def stage(name, label=None):
+    """Time the enclosed block as stage ``name`` of the current rerun."""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    depth = timings.depth
+    timings.depth += 1
+    memory = timings.enter_memory() if timings.traced else None
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        timings.depth = depth
+        timings.record(name, label, depth, started - timings.started, seconds,
+                       timings.exit_memory(memory) if timings.traced else (None, None))
+
+
+def timed(name, label=None):
+    """Decorator form of :func:`stage`; the label defaults to the function name."""
+    def decorate(func):
+        stage_label = label or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, 'timings', None) is None:
+                return func(*args, **kwargs)
+            with stage(name, stage_label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- Memory tracing ---
+# tracemalloc runs while at least one traced rerun is in progress. Reruns that
+# overlap share one tracing session; the last to finish stops it, unless it
+# was already running before (e.g. started with PYTHONTRACEMALLOC).
+
+_tracing_lock = threading.Lock()
+_tracing_reruns = 0
+_tracing_started = False
+
+
+def trace_memory_enabled():
+    return os.environ.get(TRACE_MEMORY_ENV, '').lower() in ('1', 'true', 'yes') or panel_enabled()
+
+
+def _start_tracing():
+    global _tracing_reruns, _tracing_started
+    with _tracing_lock:
+        if _tracing_reruns == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_reruns += 1
+
+
+def _stop_tracing():
+    global _tracing_reruns, _tracing_started
+    with _tracing_lock:
+        _tracing_reruns -= 1
+        if _tracing_reruns == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+@contextmanager
+def profiled_rerun(page):
+    """Collect the stages of one script run, log them, and show the dev panel."""
+    traced = trace_memory_enabled()
+    if traced:
+        _start_tracing()
+    timings = RerunTimings(page, traced)
+    _local.timings = timings
+    status = 'ok'
+    try:
+        yield timings
+    except BaseException as exc:
+        # st.stop() and st.rerun() end a run through exceptions too.
+        status = type(exc).__name__
+        raise
+    finally:
+        _local.timings = None
+        summary = timings.summary(status)
+        if traced:
+            _stop_tracing()
+        write_log(summary)
+    if panel_enabled():
+        render_panel(summary)
+
+
+# --- Rotating JSON-lines log ---
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        return None
+    return ctx.session_id if ctx else None
+
+
+def _timings_logger():
+    logger = logging.getLogger('accident.timings')
+    if logger.handlers or not LOG_PATH:
+        return logger
+    with _logger_lock:
+        if not logger.handlers:
+            try:
+                handler = logging.handlers.RotatingFileHandler(
+                    LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8'
+                )
+            except OSError:
+                handler = logging.NullHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def write_log(summary):
+    """Append one rerun summary to the timings log as a JSON line."""
+    if LOG_PATH:
+        _timings_logger().info(json.dumps(summary, default=str))
+
+
+# --- Developer panel ---
+
+def panel_enabled():
+    if os.environ.get(PANEL_ENV, '').lower() in ('1', 'true', 'yes'):
+        return True
+    try:
+        return st.query_params.get(PANEL_QUERY_PARAM) == '1'
+    except Exception:
+        return False
+
+
+def _mib(value):
+    return None if value is None else round(value / (1 << 20), 2)
+
+
+def render_panel(summary):
+    """Sidebar breakdown of the rerun that just finished."""
+    with st.sidebar.expander("Rerun timings", expanded=True):
+        memory = ""
+        if summary['peak_bytes'] is not None:
+            memory = (f", {_mib(summary['net_bytes']):+,.2f} MiB net, "
+                      f"{_mib(summary['peak_bytes']):,.2f} MiB peak")
+        st.caption(f"{summary['page']}: {summary['seconds'] * 1000:.1f} ms{memory} ({summary['status']})")
+        st.dataframe(
+            [{'stage': name, 'ms': round(seconds * 1000, 2)} for name, seconds in summary['totals'].items()],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.dataframe(
+            [
+                {
+                    'stage': '  ' * entry['depth'] + entry['stage'],
+                    'label': entry['label'],
+                    'ms': round(entry['seconds'] * 1000, 2),
+                    'net MiB': _mib(entry['net_bytes']),
+                    'peak MiB': _mib(entry['peak_bytes']),
+                }
+                for entry in sorted(summary['stages'], key=lambda e: e['start'])
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        # Imported here: figure_cache times its work with ``stage``.
+        from figure_cache import get_figure_cache
+
+        cache = get_figure_cache().stats()
+        lookups = cache['hits'] + cache['misses']
+        st.caption(f"Figure cache: {cache['hits']:,} hits, {cache['misses']:,} misses"
+                   + (f" ({cache['hits'] / lookups:.0%} hit rate)" if lookups else "")
+                   + f", {cache['evictions']:,} evictions; {cache['entries']:,} entries, "
+                   f"{cache['bytes'] / (1 << 20):.1f} of {cache['max_bytes'] / (1 << 20):.0f} MiB")
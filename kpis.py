@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from aggregates import SEVERITY_COLUMN, SEVERITY_FACTORS, VALUE_PAIRS
+from instrumentation import timed
+
+# --- KPI engine for the st.metric cards ---
+# All card values are derived from one set of per-category tables, read from
+# mergeable count aggregates (see aggregates.py) built in a single pass. The
+# tables are memoized by dataset version, so a new card only needs to read
+# from them instead of scanning the data again.
+
+SEVERE_LABEL = 'Severe Accident'
+
+# Columns whose counts (total and per severity) feed the cards.
+COUNT_COLUMNS = SEVERITY_FACTORS
+
+# (group column, value column) pairs whose per-group means feed the cards.
+MEAN_PAIRS = VALUE_PAIRS
+
+
+@dataclass(frozen=True)
+class KPITables:
+    """Per-category aggregates shared by every KPI card."""
+    rows: int
+    severity: pd.Series
+    counts: dict          # column -> DataFrame (category x severity, with 'Total')
+    overall_means: dict   # value column -> float
+    group_means: dict     # (group column, value column) -> Series
+
+
+def kpi_tables_from_aggregates(aggregates):
+    """Derive the card tables from :class:`aggregates.Aggregates` without touching rows."""
+    counts = {}
+    for column in COUNT_COLUMNS:
+        table = aggregates.crosstab(column, SEVERITY_COLUMN)
+        table['Total'] = table.sum(axis=1)
+        counts[column] = table
+
+    severity = counts[COUNT_COLUMNS[0]].drop(columns='Total').sum().sort_values(ascending=False)
+
+    overall_means = {}
+    group_means = {}
+    for group, value in MEAN_PAIRS:
+        per_group = aggregates.values(group, value)
+        sums = {g: float(v @ c) for g, (v, c) in per_group.items()}
+        sizes = {g: int(c.sum()) for g, (_, c) in per_group.items()}
+        group_means[(group, value)] = pd.Series({g: sums[g] / sizes[g] for g in sorted(per_group)}, dtype=float)
+        total = sum(sizes.values())
+        overall_means[value] = sum(sums.values()) / total if total else float('nan')
+
+    return KPITables(
+        rows=aggregates.rows,
+        severity=severity,
+        counts=counts,
+        overall_means=overall_means,
+        group_means=group_means,
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+@timed('aggregate', 'kpi tables')
+def _aggregate_kpi_tables_for_version(version, _aggregates):
+    return kpi_tables_from_aggregates(_aggregates)
+
+
+def get_aggregate_kpi_tables(version, aggregates):
+    """Return the memoized :class:`KPITables` for aggregates identified by ``version``.
+
+    ``version`` must change whenever the aggregates do, e.g. the
+    incremental snapshot version or a dataset version plus filters.
+    """
+    return _aggregate_kpi_tables_for_version(version, aggregates)
+
+
+# --- Card helpers ---
+
+def severe_total(tables):
+    return int(tables.severity.get(SEVERE_LABEL, 0))
+
+
+def top_category(tables, column, by=SEVERE_LABEL):
+    """Return ``(category, count)`` with the highest count in column ``by``, or ``(None, 0)`` if all are zero."""
+    table = tables.counts[column]
+    if by not in table.columns or table.empty or not table[by].any():
+        return None, 0
+    category = table[by].idxmax()
+    return category, int(table.at[category, by])
+
+
+def category_count(tables, column, category, by='Total'):
+    table = tables.counts[column]
+    if category not in table.index or by not in table.columns:
+        return 0
+    return int(table.at[category, by])
+
+
+def group_mean(tables, group, value, category):
+    means = tables.group_means[(group, value)]
+    return float(means.get(category, float('nan')))
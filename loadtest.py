@@ -0,0 +1,255 @@
+"""Load test: concurrent sessions against local servers, rerun latency and memory.
+
+Usage::
+
+    python loadtest.py [--sessions 1,5,10,25] [--steps 20] [--servers 2]
+                       [--modes process,mmap] [--data PATH] [--think 0.2]
+                       [--seed 0] [--out loadtest_results.json]
+
+For every data-sharing mode (``ACCIDENT_SHARED_DATA``, see column_store.py)
+and every session count N, fresh ``streamlit run sidebar.py`` servers are
+started and warmed up by one session that visits every page. N concurrent
+sessions, spread round-robin over the servers, then each open on the
+Homepage and take ``--steps`` random steps: switching to another page, or
+changing one of the sidebar filters on an analysis page. Every session stays
+connected until all are done, as open browser tabs would.
+
+Reported per run: p50/p95/p99/max rerun latency (rerun request sent to
+script finished), runs that raised, and the servers' memory summed over
+processes (RSS; its private, anonymous part; and PSS, which splits pages
+shared between processes) after warm-up, at the peak during the run and at
+the end with every session idle but connected, printed as
+baseline/peak/end. Growth per session is (end - baseline) / N.
+Use ``--data`` with a larger CSV from benchmark.py to make dataset memory
+dominate. Memory is read from /proc and is only reported on Linux.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from column_store import MODES, SHARED_DATA_ENV
+from streamlit_client import AppSession, launch_server
+
+# Share of steps that switch page; the rest change a filter when the current
+# page shows the filters (and switch page otherwise).
+PAGE_SWITCH_SHARE = 0.35
+SAMPLE_INTERVAL_S = 0.1
+PERCENTILES = (50, 95, 99)
+MIB = 1 << 20
+
+
+# --- Memory ---
+
+# /proc/<pid> file, line prefix, reported name; values are in kB. ``anon`` is
+# the private part of RSS: mapped dataset files are not counted in it.
+PROC_MEMORY = (
+    ('status', 'VmRSS:', 'rss'),
+    ('status', 'RssAnon:', 'anon'),
+    ('smaps_rollup', 'Pss:', 'pss'),
+)
+
+
+def process_memory(pid):
+    """``{'rss': bytes, 'anon': bytes, 'pss': bytes}`` of a process from /proc; empty off Linux."""
+    memory = {}
+    for name, prefix, key in PROC_MEMORY:
+        try:
+            with open(f"/proc/{pid}/{name}") as fh:
+                for line in fh:
+                    if line.startswith(prefix):
+                        memory[key] = int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+    return memory
+
+
+def servers_memory(servers):
+    """Memory of ``servers`` summed per measure."""
+    total = {}
+    for server in servers:
+        for key, value in process_memory(server.process.pid).items():
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+async def sample_peak(servers, peak, stop):
+    """Keep the per-measure maximum of :func:`servers_memory` in ``peak`` until ``stop`` is set."""
+    while not stop.is_set():
+        for key, value in servers_memory(servers).items():
+            peak[key] = max(peak.get(key, 0), value)
+        try:
+            await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL_S)
+        except asyncio.TimeoutError:
+            pass
+
+
+# --- Sessions ---
+
+def random_filter(rng, widgets):
+    """``{key: value}`` for one random filter change among the ``widgets`` on screen."""
+    key = rng.choice(sorted(widgets))
+    kind, element = widgets[key]
+    if kind == 'multiselect':
+        options = list(element.options)
+        # An empty selection clears the filter.
+        return {key: rng.sample(options, rng.randint(0, len(options)))}
+    step = element.step or 1
+    values = [element.min + i * step for i in range(int((element.max - element.min) / step) + 1)]
+    low, high = sorted(rng.sample(values, 2)) if len(values) > 1 else (values[0], values[0])
+    return {key: (low, high)}
+
+
+async def warm_up(url):
+    """Visit every page once so the servers' shared caches are built before measuring."""
+    async with AppSession(url) as session:
+        await session.run()
+        for page in session.pages:
+            await session.run(page)
+
+
+async def user(url, rng, steps, think_s, runs, done, all_done):
+    """One session: open the Homepage, then ``steps`` page switches and filter changes.
+
+    ``done()`` is called once the steps are over (or failed); the session then
+    stays connected until ``all_done`` is set.
+    """
+    try:
+        async with AppSession(url) as session:
+            result = await session.run()
+            runs.append({'action': 'open', 'page': result.page, 'seconds': result.seconds,
+                         'exceptions': result.exceptions})
+            for _ in range(steps):
+                await asyncio.sleep(rng.uniform(0, 2 * think_s))
+                if session.widgets and rng.random() >= PAGE_SWITCH_SHARE:
+                    action, result = 'filter', await session.run(widgets=random_filter(rng, session.widgets))
+                else:
+                    page = rng.choice([p for p in session.pages if p != session.page])
+                    action, result = 'page', await session.run(page)
+                runs.append({'action': action, 'page': result.page, 'seconds': result.seconds,
+                             'exceptions': result.exceptions})
+            done()
+            await all_done.wait()
+    except Exception as exc:
+        runs.append({'action': 'error', 'page': None, 'seconds': None, 'exceptions': [repr(exc)]})
+        done()
+
+
+def percentile_summary(seconds):
+    if not seconds:
+        return {}
+    cuts = statistics.quantiles(seconds, n=100, method='inclusive') if len(seconds) > 1 else [seconds[0]] * 99
+    summary = {f"p{p}_s": round(cuts[p - 1], 4) for p in PERCENTILES}
+    summary['max_s'] = round(max(seconds), 4)
+    return summary
+
+
+async def drive(servers, sessions, steps, think_s, seed):
+    """Run ``sessions`` concurrent users against ``servers``; return the level's record."""
+    for server in servers:
+        await warm_up(server.url)
+    baseline = servers_memory(servers)
+
+    runs = []
+    finished = 0
+    all_done = asyncio.Event()
+    end = {}
+
+    def done():
+        nonlocal finished
+        finished += 1
+        if finished >= sessions and not all_done.is_set():
+            # Every session is idle but still connected: what they keep.
+            end.update(servers_memory(servers))
+            all_done.set()
+
+    peak = dict(baseline)
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_peak(servers, peak, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        user(servers[i % len(servers)].url, random.Random(seed * 100003 + i), steps, think_s,
+             runs, done, all_done)
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    seconds = [run['seconds'] for run in runs if run['seconds'] is not None]
+    record = {
+        'sessions': sessions,
+        'runs': len(seconds),
+        'errors': sum(1 for run in runs if run['exceptions']),
+        'error_samples': sorted({message for run in runs for message in run['exceptions']})[:5],
+        'runs_per_s': round(len(seconds) / elapsed, 2),
+        **percentile_summary(seconds),
+    }
+    for key in sorted(baseline):
+        record[f"{key}_baseline_mib"] = round(baseline[key] / MIB, 1)
+        record[f"{key}_peak_mib"] = round(peak[key] / MIB, 1)
+        record[f"{key}_end_mib"] = round(end[key] / MIB, 1)
+        record[f"{key}_growth_per_session_mib"] = round((end[key] - baseline[key]) / MIB / sessions, 2)
+    return record
+
+
+def run_level(mode, sessions, args):
+    env = {SHARED_DATA_ENV: mode, 'ACCIDENT_TIMINGS_LOG': ''}
+    if args.data:
+        env['ACCIDENT_DATA'] = str(Path(args.data).resolve())
+    with ExitStack() as stack:
+        servers = [stack.enter_context(launch_server(env=env)) for _ in range(args.servers)]
+        record = asyncio.run(drive(servers, sessions, args.steps, args.think, args.seed))
+    record['mode'] = mode
+    record['servers'] = args.servers
+    return record
+
+
+def describe(record):
+    line = (f"{record['mode']:>7} N={record['sessions']:<4} runs={record['runs']:<5} "
+            f"p50={record.get('p50_s', 0):.3f}s p95={record.get('p95_s', 0):.3f}s "
+            f"p99={record.get('p99_s', 0):.3f}s errors={record['errors']}")
+    for key in ('rss', 'anon', 'pss'):
+        if f"{key}_baseline_mib" in record:
+            line += (f" | {key.upper()} {record[f'{key}_baseline_mib']:.0f}"
+                     f"/{record[f'{key}_peak_mib']:.0f}/{record[f'{key}_end_mib']:.0f} MiB "
+                     f"({record[f'{key}_growth_per_session_mib']:+.2f}/session)")
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', default='1,5,10,25', help="comma-separated concurrent session counts")
+    parser.add_argument('--steps', type=int, default=20, help="page switches and filter changes per session")
+    parser.add_argument('--servers', type=int, default=2, help="server processes sharing the sessions")
+    parser.add_argument('--modes', default=','.join(MODES), help=f"comma-separated {SHARED_DATA_ENV} values")
+    parser.add_argument('--data', help="CSV to serve instead of student_df.csv")
+    parser.add_argument('--think', type=float, default=0.2, help="mean pause between steps, in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='loadtest_results.json')
+    args = parser.parse_args(argv)
+
+    modes = args.modes.split(',')
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(sorted(unknown))}")
+    levels = [int(n) for n in args.sessions.split(',')]
+
+    records = []
+    for mode in modes:
+        for sessions in levels:
+            record = run_level(mode, sessions, args)
+            records.append(record)
+            print(describe(record), flush=True)
+    Path(args.out).write_text(json.dumps(records, indent=2))
+    return 1 if any(record['errors'] for record in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+
+# --- Size-bounded LRU ---
+# Shared by the caches that hold serialized payloads (figure JSON, encoded
+# images): entries are evicted least recently used first once their total
+# size passes a byte budget, rather than after a fixed number of entries.
+
+
+class BytesLRU:
+    """Thread-safe LRU of ``str``/``bytes`` payloads bounded by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached payload for ``key`` (marking it recently used), or ``None``."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = payload
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# --- Latest version per key ---
+# The shared frames, filter indexes and backends built from the CSV only ever
+# serve its current version. Keeping one entry per path, replaced when the
+# file's stat changes, bounds a process to one copy of each however often
+# rows are appended, where a cache keyed on the stat would keep old versions
+# until they aged out.
+
+
+class LatestByKey:
+    """Thread-safe map of ``key`` to the value built for its latest ``version``."""
+
+    def __init__(self):
+        self._entries = {}   # key -> (version, value)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        """Return the value for ``(key, version)``, calling ``build()`` if the version changed."""
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key in self._entries and self._entries[key][0] == version:
+                return self._entries[key][1]
+            # Let go of the old version before building, so both are never held here at once.
+            self._entries.pop(key, None)
+            value = build()
+            self._entries[key] = (version, value)
+            return value
@@ -1,41 +1,92 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import numpy as np
-import seaborn as sns
+
+from charts import scatter_chart
+from figure_cache import cached_figure
+from filters import current_filters, filter_frame
+from ingest import get_streamed_dataset
+from instrumentation import stage
+from precompute import get_precomputed
+from thresholds import get_thresholds
 
 st.title("Analysis of Factors Influencing Motorbike Accident Severity") # Changed header text
 st.markdown("<hr style='border-top: 3px solid #bbb; border-radius: 3px;'>", unsafe_allow_html=True)
 
-# --- Dummy Data Creation ---
-# Replace this section with your actual data loading,
-# for example: df_encoded = pd.read_csv("your_data.csv")
-# We create this dummy data just so the app can run.
-@st.cache_data
-def load_data():
-    data = {
-        'Number_of_Vehicles': np.random.randint(1, 10, 200),
-        'Bike_Speed': np.random.randint(20, 100, 200),
-        'Accident_Severity': np.random.choice(['Low', 'Moderate', 'High'], 200),
-        'Traffic_Density': np.random.uniform(1.0, 10.0, 200),
-        'Biker_Age': np.random.randint(16, 70, 200)
-    }
-    return pd.DataFrame(data)
-
-df_encoded = load_data()
-# --- End of Dummy Data Section ---
+# --- Data Loading ---
+# Stream the real accident data in fixed-size chunks, keeping only the columns
+# this page plots or filters on (see ingest.py). The result is shared by every
+# session and re-read only when the file changes.
+MAIN_COLUMNS = [
+    'Number_of_Vehicles', 'Bike_Speed', 'Accident_Severity', 'Traffic_Density', 'Biker_Age',
+    'Road_Type', 'Weather', 'Time_of_Day',
+]
+
+try:
+    with stage('load', 'streamed dataset'):
+        dataset, ingest_report = get_streamed_dataset(columns=MAIN_COLUMNS)
+except FileNotFoundError:
+    st.error("Error: 'student_df.csv' not found. Make sure it's in the same folder as your app.py.")
+    st.stop()
+
+# Apply the global sidebar filters (see filters.py).
+filters = current_filters()
+with stage('load', 'filtered frame'):
+    df_encoded = filter_frame(dataset, filters)
+    data_version = f"{dataset.version}:{filters!r}"
+    # Unfiltered views are served from the offline artifact when it is current
+    # (see precompute.py); otherwise everything below is computed live.
+    artifact = None if filters.active else get_precomputed()
+if ingest_report.rows_dropped:
+    st.warning(f"Skipped {ingest_report.rows_dropped:,} of {ingest_report.rows_read:,} rows with missing or invalid values.")
+if df_encoded.empty:
+    st.warning("No records match the selected filters.")
+    st.stop()
+if filters.active:
+    st.caption(f"Filtered to {len(df_encoded):,} records ({filters.describe()}).")
+# --- End of Data Loading ---
 
 st.title("Biker Accident Analysis")
 st.success("""Objectives: to understand how bike speed, in combination with other variables like traffic, vehicle count, and biker age, relates to or influences the severity of an accident.""")
 
 
-import streamlit as st
-
 # Set page to wide layout to give the columns more space
 st.set_page_config(layout="wide")
 
 st.header("Key High-Risk Indicators for Severe Accidents")
-st.write("These metrics show the high-risk thresholds identified from the data visualizations.")
+st.write("These metrics show the high-risk thresholds identified from the data: for each variable, the cut point whose riders have the highest severe-accident rate relative to the overall rate.")
+
+# --- Risk thresholds, swept over every cut point (see thresholds.py) ---
+with stage('aggregate', 'risk thresholds'):
+    risk = artifact.thresholds if artifact else get_thresholds(data_version, df_encoded)
+RISK_NAMES = {
+    'Biker_Age': 'Biker Age',
+    'Bike_Speed': 'Bike Speed',
+    'Traffic_Density': 'Traffic Density',
+    'Number_of_Vehicles': 'Number of Vehicles',
+}
+
+def risk_value(column):
+    threshold = risk.get(column)
+    return threshold.label() if threshold else "n/a"
+
+def risk_help(column):
+    threshold = risk.get(column)
+    if threshold is None:
+        return "Not enough records to identify a threshold."
+    return (
+        f"Records with {RISK_NAMES[column]} {threshold.label()} have a {threshold.severe_rate:.1%} "
+        f"severe-accident rate, {threshold.lift:.2f}x the overall rate ({threshold.support:,} records)."
+    )
+
+def risk_text(column):
+    threshold = risk.get(column)
+    if threshold is None:
+        return "No threshold could be identified for the current selection."
+    side = "below" if threshold.operator == '<' else "above"
+    return (
+        f"Of all cut points, {RISK_NAMES[column]} {side} {threshold.value:g} gives the highest share of "
+        f"'Severe' accidents: {threshold.severe_rate:.1%} of {threshold.support:,} records, "
+        f"{threshold.lift:.2f} times the overall rate."
+    )
 
 # Create 4 columns
 col1, col2, col3, col4 = st.columns(4)
@@ -46,8 +97,8 @@ with col1:
     with st.container(border=True):
         st.metric(
             label="High-Risk Age",
-            value="< 30",
-            help="Younger riders (approx. 15-30) are disproportionately involved in severe accidents at high speeds."
+            value=risk_value('Biker_Age'),
+            help=risk_help('Biker_Age')
         )
 
 # --- Column 2: Bike Speed ---
@@ -55,8 +106,8 @@ with col2:
     with st.container(border=True):
         st.metric(
             label="High-Risk Speed",
-            value="> 80",
-            help="Speeds over 80 are strongly correlated with severe accidents, especially when combined with other factors."
+            value=risk_value('Bike_Speed'),
+            help=risk_help('Bike_Speed')
         )
 
 # --- Column 3: Traffic Density ---
@@ -64,8 +115,8 @@ with col3:
     with st.container(border=True):
         st.metric(
             label="High-Risk Density",
-            value="> 6.0",
-            help="High-density, congested traffic (rated > 6.0) significantly amplifies the danger of high-speed travel."
+            value=risk_value('Traffic_Density'),
+            help=risk_help('Traffic_Density')
         )
 
 # --- Column 4: Number of Vehicles ---
@@ -73,77 +124,85 @@ with col4:
     with st.container(border=True):
         st.metric(
             label="High-Risk Vehicle Count",
-            value="> 5",
-            help="Crowded roads (5+ vehicles) reduce reaction time and maneuvering space, compounding risk."
+            value=risk_value('Number_of_Vehicles'),
+            help=risk_help('Number_of_Vehicles')
         )
 
-import streamlit as st
-
-st.info("""
+st.info(f"""
 
-* **1. High-Risk Age: Under 30** This indicates that the analysis identified riders under the age of 30 as the group most likely to be involved in 'Severe' and 'Moderate' accidents, particularly when they are riding at high speeds.
+* **1. High-Risk Age: {risk_value('Biker_Age')}**
+    {risk_text('Biker_Age')}
 
-* **2. High-Risk Speed: Over 80**
-    This finding pinpoints riding faster than 80 km/h as a major threshold for danger. The charts demonstrated that the most serious accidents are predominantly grouped above this speed.
+* **2. High-Risk Speed: {risk_value('Bike_Speed')}**
+    {risk_text('Bike_Speed')}
 
-* **3. High-Risk Density: Over 6.0**
-    This measurement defines what congested traffic means. The data reveals that when the traffic density score is above 6.0, the road environment turns into a "risk amplifier," making high-speed riding considerably more hazardous.
+* **3. High-Risk Density: {risk_value('Traffic_Density')}**
+    {risk_text('Traffic_Density')}
 
-* **4. High-Risk Vehicle Count: Over 5**
-    This measurement defines a "crowded road." The analysis discovered that when more than five vehicles are present nearby, the chance of a severe accident rises sharply because the motorcyclist has less time to react and less room to maneuver.
+* **4. High-Risk Vehicle Count: {risk_value('Number_of_Vehicles')}**
+    {risk_text('Number_of_Vehicles')}
 """)
 
 # --- Visualization 1: Bike Speed vs Number of Vehicles ---
 
-fig1 = px.scatter(
+fig1 = cached_figure(data_version, 'main/speed_vs_vehicles', lambda: scatter_chart(
     df_encoded,
     x='Number_of_Vehicles',
     y='Bike_Speed',
     color='Accident_Severity',
+    version=data_version,  # switches to WebGL / density bins for large data
+    binned=artifact.bins.get(('Number_of_Vehicles', 'Bike_Speed')) if artifact else None,
     opacity=0.6,  # <--- Correct argument for transparency
     title='Bike Speed vs Number of Vehicles by Accident Severity',
     labels={
         'Number_of_Vehicles': 'Number of Vehicles',
         'Bike_Speed': 'Bike Speed'
     }
-)
+))
 
 # --- 4. STREAMLIT DISPLAY COMMAND ---
-st.plotly_chart(fig1, use_container_width=True)
+with stage('serialize', 'main/speed_vs_vehicles'):
+    st.plotly_chart(fig1, use_container_width=True)
 
 st.success("""The hazard of high speed is intensified by road complexity. A large number of vehicles reduces a riders space to maneuver and their time to react, which makes high speed a leading cause of severe accidents.""")
 
-fig2 = px.scatter(
+fig2 = cached_figure(data_version, 'main/speed_vs_density', lambda: scatter_chart(
     df_encoded,
     x='Traffic_Density',
     y='Bike_Speed',
     color='Accident_Severity',
+    version=data_version,  # switches to WebGL / density bins for large data
+    binned=artifact.bins.get(('Traffic_Density', 'Bike_Speed')) if artifact else None,
     opacity=0.6, 
     title='Bike Speed vs Traffic Density by Accident Severity',
     labels={
         'Traffic_Density': 'Traffic Density',
         'Bike_Speed': 'Bike Speed'
     }
-)
-st.plotly_chart(fig2, use_container_width=True)
+))
+with stage('serialize', 'main/speed_vs_density'):
+    st.plotly_chart(fig2, use_container_width=True)
 st.success("""The main finding from the 'Bike Speed vs. Traffic Density' chart is that the condition of traffic flow is a key factor that increases the risk of high-speed travel. The visualization indicates that 'Severe' and 'Moderate' accidents are clustered in the top-right section, which represents the combination of high bike speed and high-density traffic. This is importantly different from number of vehicles; "High density" describes a mentally taxing, unpredictable, and often stop-and-go setting. The chart reveals that high speed in a low-density, free-flowing environment (top-left) is much less linked to severe accidents. Therefore, the primary conclusion is that the danger of high speed is heightened by the complexity and unpredictability of congested traffic, which overwhelms a riders capacity to anticipate and respond to numerous, nearby hazards.""")
 
 
 # --- Visualization 3: Bike Speed vs Biker Age ---
 
-fig3 = px.scatter(
+fig3 = cached_figure(data_version, 'main/speed_vs_age', lambda: scatter_chart(
     df_encoded,
     x='Biker_Age',
     y='Bike_Speed',
     color='Accident_Severity',
+    version=data_version,  # switches to WebGL / density bins for large data
+    binned=artifact.bins.get(('Biker_Age', 'Bike_Speed')) if artifact else None,
     opacity=0.6, 
     title='Bike Speed vs Biker Age by Accident Severity',
     labels={
         'Biker_Age': 'Biker Age',
         'Bike_Speed': 'Bike Speed'
     }
-)
-st.plotly_chart(fig3, use_container_width=True)
+))
+with stage('serialize', 'main/speed_vs_age'):
+    st.plotly_chart(fig3, use_container_width=True)
 
 st.success("""The key finding from the Bike Speed vs. Biker Age chart is that age plays a critical role in modifying the risk of high-speed riding. The visualization clearly shows a dense cluster of 'Severe' (red) and 'Moderate' (orange) accidents gathered in the top-left section. This specific area represents the hazardous mix of high bike speed and a young rider age approximately 15-30 years old. In sharp contrast, the top-right section, which shows older riders ride at similarly high speeds, displays far fewer serious incidents. This powerfully illustrates that the risk of high speed is not equal for all and is disproportionately higher for younger riders, suggesting that elements like inexperience or how they perceive risk are major factors in accident severity.""")
 
@@ -0,0 +1,249 @@
+"""Offline precompute of every aggregate the analysis pages show.
+
+Usage::
+
+    python precompute.py [--data student_df.csv] [--out student_df.aggregates.npz] [--workers N]
+
+The work is split into one task per chart / KPI group and run on a process
+pool. Results are written to a single versioned ``.npz`` artifact. The pages
+serve from it while it matches the CSV (same size and mtime) and no sidebar
+filters are active, and fall back to live computation otherwise.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from aggregates import AGGREGATE_COLUMNS, COUNT_PAIRS, VALUE_PAIRS, Aggregates, all_pair_counts, group_counts
+from charts import DENSITY_BINS, binned_counts
+from dataset import DATA_PATH, read_dataset
+from instrumentation import timed
+from lru import LatestByKey
+from thresholds import RISK_COLUMNS, Threshold, best_threshold
+
+ARTIFACT_FORMAT = 3
+ARTIFACT_PATH = DATA_PATH.with_name(f"{DATA_PATH.stem}.aggregates.npz")
+
+# (x, y) pairs of the main.py scatter plots, coloured by Accident_Severity.
+SCATTER_PAIRS = [
+    ('Number_of_Vehicles', 'Bike_Speed'),
+    ('Traffic_Density', 'Bike_Speed'),
+    ('Biker_Age', 'Bike_Speed'),
+]
+
+
+@dataclass(frozen=True)
+class Precomputed:
+    """Contents of an artifact, in the shapes the pages consume."""
+    version: str
+    source_mtime_ns: int
+    source_size: int
+    aggregates: Aggregates
+    thresholds: dict  # column -> Threshold or None
+    bins: dict        # (x, y) -> long frame from charts.binned_counts
+
+
+def build_tasks():
+    """One task per chart or KPI group."""
+    tasks = [('order',), ('tables',)]
+    tasks += [('pair',) + pair for pair in COUNT_PAIRS]
+    tasks += [('values',) + pair for pair in VALUE_PAIRS]
+    tasks += [('threshold', column) for column in RISK_COLUMNS]
+    tasks += [('bins', x, y) for x, y in SCATTER_PAIRS]
+    return tasks
+
+
+# --- Worker side ---
+
+_FRAME = None
+
+
+def _init_worker(path):
+    global _FRAME
+    _FRAME = read_dataset(path).frame
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _counts_arrays(counts):
+    return {
+        'level0': np.asarray(counts.index.get_level_values(0)),
+        'level1': np.asarray(counts.index.get_level_values(1)),
+        'count': counts.to_numpy(),
+    }
+
+
+def run_task(task):
+    """Compute one task against the worker's frame and return plain arrays."""
+    kind = task[0]
+    if kind == 'order':
+        return {
+            column: [_plain(v) for v in pd.unique(_FRAME[column]) if pd.notna(v)]
+            for column in AGGREGATE_COLUMNS if column in _FRAME
+        }
+    if kind in ('pair', 'values'):
+        return _counts_arrays(group_counts(_FRAME, task[1:]))
+    if kind == 'tables':
+        return {pair: _counts_arrays(counts) for pair, counts in all_pair_counts(_FRAME).items()}
+    if kind == 'threshold':
+        threshold = best_threshold(_FRAME, task[1])
+        return asdict(threshold) if threshold else None
+    if kind == 'bins':
+        x, y = task[1:]
+        table = binned_counts(_FRAME, x, y, 'Accident_Severity', DENSITY_BINS)
+        return {column: table[column].to_numpy() for column in table.columns}
+    raise ValueError(f"unknown task {task!r}")
+
+
+# --- Artifact I/O ---
+
+def _task_key(task):
+    return '/'.join(task)
+
+
+def _as_array(values):
+    values = np.asarray(values)
+    # Strings are stored as fixed-width unicode so the file loads without pickle.
+    return values.astype(str) if values.dtype == object else values
+
+
+def write_artifact(out, meta, results):
+    arrays = {'__meta__': np.array(json.dumps(meta))}
+    for task, result in results.items():
+        if isinstance(result, dict) and task[0] in ('pair', 'values', 'bins'):
+            for name, values in result.items():
+                arrays[f"{_task_key(task)}/{name}"] = _as_array(values)
+        elif task[0] == 'tables':
+            for pair, counts in result.items():
+                for name, values in counts.items():
+                    arrays[f"{_task_key(('table',) + pair)}/{name}"] = _as_array(values)
+    out = Path(out)
+    tmp = out.with_name(out.name + '.tmp.npz')
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, out)
+
+
+def _counts_from(arrays, key, names):
+    index = pd.MultiIndex.from_arrays(
+        [arrays[f"{key}/level0"], arrays[f"{key}/level1"]], names=list(names)
+    )
+    return pd.Series(arrays[f"{key}/count"].astype('int64'), index=index, name='count')
+
+
+@timed('load')
+def read_artifact(path=ARTIFACT_PATH):
+    """Load an artifact written by :func:`precompute`."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json.loads(str(arrays['__meta__']))
+    if meta.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"unsupported artifact format {meta.get('format')!r}")
+
+    aggregates = Aggregates(
+        rows=meta['rows'],
+        order={column: tuple(values) for column, values in meta['order'].items()},
+        pair_counts={pair: _counts_from(arrays, _task_key(('pair',) + pair), pair) for pair in COUNT_PAIRS},
+        value_counts={pair: _counts_from(arrays, _task_key(('values',) + pair), pair) for pair in VALUE_PAIRS},
+        table_counts={
+            pair: _counts_from(arrays, _task_key(('table',) + pair), pair)
+            for pair in combinations(meta['columns'], 2)
+        },
+    )
+    thresholds = {
+        column: Threshold(**value) if value else None
+        for column, value in meta['thresholds'].items()
+    }
+    bins = {}
+    for x, y in SCATTER_PAIRS:
+        key = _task_key(('bins', x, y))
+        columns = ['Accident_Severity', x, y, 'count']
+        bins[(x, y)] = pd.DataFrame({c: arrays[f"{key}/{c}"] for c in columns if f"{key}/{c}" in arrays})
+
+    return Precomputed(
+        version=meta['dataset_version'],
+        source_mtime_ns=meta['source_mtime_ns'],
+        source_size=meta['source_size'],
+        aggregates=aggregates,
+        thresholds=thresholds,
+        bins=bins,
+    )
+
+
+# --- Driver ---
+
+def precompute(path=DATA_PATH, out=ARTIFACT_PATH, workers=None):
+    """Compute every task on a process pool and write the artifact. Returns its metadata."""
+    started = time.perf_counter()
+    stat = os.stat(path)
+    # Builds the Parquet copy once so each worker starts from it.
+    dataset = read_dataset(path)
+    tasks = build_tasks()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(path),)) as pool:
+        results = dict(zip(tasks, pool.map(run_task, tasks)))
+
+    meta = {
+        'format': ARTIFACT_FORMAT,
+        'dataset_version': dataset.version,
+        'source': str(path),
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_size': stat.st_size,
+        'rows': len(dataset.frame),
+        'columns': list(dataset.frame.columns),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'tasks': [_task_key(task) for task in tasks],
+        'order': results[('order',)],
+        'thresholds': {task[1]: results[task] for task in tasks if task[0] == 'threshold'},
+    }
+    write_artifact(out, meta, results)
+    meta['seconds'] = round(time.perf_counter() - started, 3)
+    return meta
+
+
+def is_fresh(artifact, path=DATA_PATH):
+    """True if ``artifact`` was built from the current contents of ``path``."""
+    stat = os.stat(path)
+    return artifact.source_mtime_ns == stat.st_mtime_ns and artifact.source_size == stat.st_size
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_artifacts():
+    return LatestByKey()
+
+
+def get_precomputed(path=DATA_PATH, artifact_path=ARTIFACT_PATH):
+    """Return the shared :class:`Precomputed` artifact if it is current, else ``None``."""
+    try:
+        mtime_ns = os.stat(artifact_path).st_mtime_ns
+        artifact = _shared_artifacts().get(str(artifact_path), mtime_ns, lambda: read_artifact(artifact_path))
+    except (OSError, ValueError, KeyError):
+        return None
+    return artifact if is_fresh(artifact, path) else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=str(DATA_PATH), help="source CSV (default: %(default)s)")
+    parser.add_argument('--out', default=None, help="artifact path (default: <data>.aggregates.npz)")
+    parser.add_argument('--workers', type=int, default=None, help="process pool size (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    data = Path(args.data)
+    out = Path(args.out) if args.out else data.with_name(f"{data.stem}.aggregates.npz")
+    meta = precompute(data, out, args.workers)
+    print(f"Wrote {out} ({len(meta['tasks'])} tasks, {meta['rows']:,} rows, "
+          f"version {meta['dataset_version']}) in {meta['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 import streamlit as st
 
+from instrumentation import profiled_rerun, stage
+
 st.set_page_config(
     page_title="MotorBike"
 )
@@ -22,4 +24,16 @@ pg = st.navigation(
     }
 )
 
-pg.run()
+# Every run is timed stage by stage and logged (see instrumentation.py).
+with profiled_rerun(pg.title):
+    # Global filters shared by the analysis pages (see filters.py). They are
+    # imported here rather than at the top so that the Homepage, the default
+    # page of every new session, never loads pandas, NumPy or Plotly Express.
+    if pg.title != home.title:
+        from backends import filter_source
+        from filters import render_sidebar_filters
+
+        with stage('load', 'sidebar filters'):
+            render_sidebar_filters(filter_source())
+
+    pg.run()
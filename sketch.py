@@ -0,0 +1,162 @@
+"""Streaming quantile sketch for box plots over data that does not fit in memory.
+
+Usage::
+
+    python sketch.py [--data student_df.csv] [--chunk-rows 100000] [--k 200]
+                     [--seed 0] [--max-error 0.02]
+
+Run as a script, the CSV is streamed in chunks through
+``charts.sketch_box_stats`` for every box plot the exposure page draws
+(``aggregates.VALUE_PAIRS``). The sketched box statistics are printed next to
+the exact ones, with ``charts.sketch_accuracy``'s rank error per quartile.
+The exit status is non-zero if any error exceeds ``--max-error``.
+"""
+import argparse
+import math
+import sys
+
+import numpy as np
+
+# --- Streaming quantile sketch ---
+# A KLL-style sketch (Karnin, Lang & Liberty): items are kept in a stack of
+# "compactors"; level h holds items of weight 2**h. When a level overflows it
+# is sorted and every other item (random offset) is promoted to the next level.
+# Memory stays O(k log(n/k)) while rank error is roughly O(1/k), and sketches
+# built over separate chunks can be merged.
+
+
+class KLLSketch:
+    """Mergeable approximate-quantile sketch over a stream of numbers."""
+
+    def __init__(self, k=200, seed=None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        """Add an array (or scalar) of values to the sketch."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch and return ``self``."""
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                # Keep one item back on odd sizes so total weight is preserved.
+                keep = items[:1] if items.size % 2 else items[:0]
+                pairs = items[keep.size:]
+                offset = int(self._rng.integers(2))
+                self._levels[level] = keep
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1], pairs[offset::2]])
+            level += 1
+
+    def _weighted_items(self):
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(lv.size, 2 ** h, dtype=np.int64) for h, lv in enumerate(self._levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def retained(self):
+        """Return the sorted items currently held by the sketch (any weight)."""
+        return self._weighted_items()[0]
+
+    def quantile(self, q):
+        """Return the approximate ``q`` quantile(s) of everything seen so far."""
+        q = np.asarray(q, dtype=float)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights)
+        positions = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = items[np.clip(positions, 0, items.size - 1)]
+        # The exact extremes are tracked separately.
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result if result.ndim else float(result)
+
+    def __len__(self):
+        return self.count
+
+
+def rank_error(sketch, values, quantiles=(0.25, 0.5, 0.75)):
+    """Return the normalized rank error of ``sketch`` at each quantile.
+
+    For each ``q`` this is ``|rank(estimate) / n - q|`` measured against the
+    exact sorted ``values``, i.e. how far (as a fraction of the data) the
+    sketch's answer is from the true quantile.
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    values = values[~np.isnan(values)]
+    estimates = np.atleast_1d(sketch.quantile(quantiles))
+    lo = np.searchsorted(values, estimates, side='left') / values.size
+    hi = np.searchsorted(values, estimates, side='right') / values.size
+    q = np.asarray(quantiles, dtype=float)
+    # Any rank between lo and hi is a correct answer for a repeated value.
+    return np.where(q < lo, lo - q, np.where(q > hi, q - hi, 0.0))
+
+
+def main(argv=None):
+    import pandas as pd
+
+    from aggregates import VALUE_PAIRS, aggregate_frame
+    from charts import aggregate_box_stats, sketch_accuracy, sketch_box_stats
+    from dataset import DATA_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=str(DATA_PATH), help="source CSV (default: %(default)s)")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--k', type=int, default=200, help="sketch size; rank error is roughly 1/k")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-error', type=float, default=0.02, help="largest acceptable rank error")
+    args = parser.parse_args(argv)
+
+    columns = ['count', 'q1', 'median', 'q3', 'lowerfence', 'upperfence']
+    worst = 0.0
+    for x, y in VALUE_PAIRS:
+        chunks = pd.read_csv(args.data, usecols=[x, y], chunksize=args.chunk_rows)
+        sketched, sketches = sketch_box_stats(chunks, x, y, k=args.k, seed=args.seed)
+        exact_frame = pd.read_csv(args.data, usecols=[x, y])
+        exact = aggregate_box_stats(aggregate_frame(exact_frame), x, y)
+        errors = sketch_accuracy(sketches, exact_frame, x, y)
+        table = pd.concat({'sketch': sketched[columns], 'exact': exact[columns]}, axis=1)
+        print(f"{y} by {x}:\n{table.to_string()}\nrank error:\n{errors.to_string()}\n")
+        worst = max(worst, float(errors.to_numpy().max(initial=0.0)))
+
+    print(f"Largest rank error {worst:.4f} (limit {args.max_error})")
+    return 1 if worst > args.max_error else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
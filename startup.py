@@ -0,0 +1,172 @@
+"""Startup-time budget check: import cost per page and Homepage time to first paint.
+
+Usage::
+
+    python startup.py [--repeat 3] [--out startup_results.json] [--no-server]
+
+For every page the modules the app imports on the way to that page (the
+top-level imports of sidebar.py and the page script, plus the ones sidebar.py
+defers to the analysis pages) are imported in a fresh ``python -X importtime``
+process. The check fails if a page pulls in a module on its deny list or its
+imports take longer than the budget. Homepage banner images missing from
+``assets/`` are reported, as the page then loads them from the network (see
+assets.py). With a server, the Homepage's time to
+first paint (process start to first element received by a fresh session) is
+measured against a local ``streamlit run sidebar.py``. Results go to a JSON
+file and the exit status is non-zero on any violation.
+"""
+import argparse
+import ast
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+ENTRY_POINT = 'sidebar.py'
+HOME = 'home.py'
+
+PAGES = {
+    'Homepage': HOME,
+    'Biker Accident Analysis': 'main.py',
+    'Accident Severity Analysis': 'Accident Severity Analysis.py',
+    'Biker Data and Environmental Exposure Analysis': 'Biker Data and Environmental exposure Analysis.py',
+}
+
+# Never imported by any page; the Homepage additionally must not load the
+# scientific stack at all.
+DENIED_EVERYWHERE = {'seaborn', 'matplotlib', 'scipy'}
+DENIED_ON_HOME = DENIED_EVERYWHERE | {'pandas', 'numpy', 'pyarrow', 'plotly.express'}
+
+IMPORT_BUDGET_S = {'Homepage': 1.0, '*': 2.5}
+FIRST_PAINT_BUDGET_S = 6.0
+
+_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def script_imports(path, deferred=False):
+    """Import statements of a script: module level only, or every one with ``deferred``."""
+    tree = ast.parse(Path(path).read_text(encoding='utf-8'))
+    nodes = ast.walk(tree) if deferred else tree.body
+    return [ast.unparse(node) for node in nodes if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def page_imports(page):
+    """Statements executed, in order, before ``page`` renders under sidebar.py."""
+    statements = script_imports(ROOT / ENTRY_POINT, deferred=page != HOME)
+    statements += script_imports(ROOT / page)
+    return list(dict.fromkeys(statements))
+
+
+def measure_imports(statements):
+    """Import ``statements`` in a fresh interpreter; return ``(seconds, {module: cumulative_s})``."""
+    code = '\n'.join(['import time as _t', '_start = _t.perf_counter()', *statements,
+                      'print(_t.perf_counter() - _start)'])
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2)) / 1e6
+    return float(proc.stdout.strip().splitlines()[-1]), modules
+
+
+def check_imports(repeat):
+    baseline = set(measure_imports([])[1])
+    records = []
+    for title, page in PAGES.items():
+        statements = page_imports(page)
+        runs = [measure_imports(statements) for _ in range(repeat)]
+        seconds = statistics.median(run[0] for run in runs)
+        modules = set(runs[0][1]) - baseline
+        denied = DENIED_ON_HOME if page == HOME else DENIED_EVERYWHERE
+        budget = IMPORT_BUDGET_S.get(title, IMPORT_BUDGET_S['*'])
+        violations = [f"imports {name}" for name in sorted(modules & denied)]
+        if seconds > budget:
+            violations.append(f"import time {seconds:.3f}s > {budget}s")
+        top_level = [name for name in runs[0][1] if '.' not in name and name in modules]
+        heaviest = sorted(top_level, key=lambda name: runs[0][1][name], reverse=True)[:5]
+        records.append({
+            'page': title,
+            'import_s': round(seconds, 4),
+            'modules': len(modules),
+            'heaviest': {name: round(runs[0][1][name], 4) for name in heaviest},
+            'violations': violations,
+        })
+    return records
+
+
+def check_assets():
+    """Banner images not on disk; the Homepage shows them from their original URLs instead."""
+    from assets import missing_assets
+
+    return {'page': 'Homepage', 'missing_assets': missing_assets(), 'violations': []}
+
+
+def measure_first_paint(repeat):
+    """Seconds from ``streamlit run`` to the Homepage's first element, for a fresh server each time."""
+    from streamlit_client import first_run, launch_server
+
+    runs = []
+    for _ in range(repeat):
+        with launch_server() as server:
+            result = first_run(server.url)
+            runs.append({
+                'server_ready_s': server.ready_s,
+                'first_paint_s': server.ready_s + result.first_delta_s,
+                'first_run_s': result.seconds,
+                'exceptions': result.exceptions,
+            })
+    record = {key: round(statistics.median(run[key] for run in runs), 4)
+              for key in ('server_ready_s', 'first_paint_s', 'first_run_s')}
+    record['page'] = 'Homepage'
+    record['violations'] = [f"exception: {message}" for run in runs for message in run['exceptions']]
+    if record['first_paint_s'] > FIRST_PAINT_BUDGET_S:
+        record['violations'].append(f"first paint {record['first_paint_s']}s > {FIRST_PAINT_BUDGET_S}s")
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement; the median is reported")
+    parser.add_argument('--out', default='startup_results.json')
+    parser.add_argument('--no-server', action='store_true', help="skip the time-to-first-paint measurement")
+    args = parser.parse_args(argv)
+
+    imports = check_imports(args.repeat)
+    for record in imports:
+        status = 'FAIL' if record['violations'] else 'ok'
+        print(f"[{status}] {record['page']}: imports {record['import_s']}s, {record['modules']} modules, "
+              f"heaviest {', '.join(f'{k} {v}s' for k, v in record['heaviest'].items())}", flush=True)
+    assets = check_assets()
+    if assets['missing_assets']:
+        print(f"[warn] Homepage assets: {', '.join(assets['missing_assets'])} missing, served from their "
+              "original URLs (run `python assets.py --fetch`)")
+    else:
+        print("[ok] Homepage assets: all present")
+    first_paint = None
+    if not args.no_server:
+        first_paint = measure_first_paint(args.repeat)
+        status = 'FAIL' if first_paint['violations'] else 'ok'
+        print(f"[{status}] Homepage first paint {first_paint['first_paint_s']}s "
+              f"(server ready {first_paint['server_ready_s']}s, first run {first_paint['first_run_s']}s)")
+
+    failures = [f"{r['page']}: {'; '.join(r['violations'])}"
+                for r in imports + [assets, first_paint] if r and r['violations']]
+    Path(args.out).write_text(json.dumps(
+        {'imports': imports, 'assets': assets, 'first_paint': first_paint, 'failures': failures}, indent=2))
+    if failures:
+        print("Startup budget exceeded:\n  " + "\n  ".join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Headless client for a locally launched Streamlit server.
+
+Speaks the app's websocket protocol directly (protobuf BackMsg / ForwardMsg
+over ``/_stcore/stream``), so scripts such as startup.py and loadtest.py can
+time real script runs end to end without a browser.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+
+ROOT = Path(__file__).resolve().parent
+ENTRY_POINT = 'sidebar.py'
+
+
+@dataclass
+class Server:
+    url: str
+    process: subprocess.Popen
+    spawned: float     # perf_counter() when the process was started
+    ready_s: float     # seconds until /_stcore/health answered
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def launch_server(script=ENTRY_POINT, port=None, env=None, timeout=60):
+    """Run ``streamlit run script`` headless on a free local port until the block exits."""
+    port = port or free_port()
+    spawned = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', script,
+         '--server.headless', 'true', '--server.port', str(port),
+         '--server.address', '127.0.0.1', '--browser.gatherUsageStats', 'false'],
+        cwd=ROOT, env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with status {process.returncode}")
+            if time.perf_counter() - spawned > timeout:
+                raise TimeoutError(f"{url} not healthy after {timeout}s")
+            try:
+                urllib.request.urlopen(f"{url}/_stcore/health", timeout=1).read()
+                break
+            except OSError:
+                time.sleep(0.05)
+        yield Server(url, process, spawned, time.perf_counter() - spawned)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@dataclass
+class RunResult:
+    """One script run as seen by the client."""
+    page: str
+    seconds: float                # rerun request sent -> script_finished received
+    first_delta_s: float          # rerun request sent -> first element received
+    deltas: int = 0
+    exceptions: list = field(default_factory=list)
+    status: int = 0               # ScriptFinishedStatus
+
+
+# Widgets the client can set, by element type, and the WidgetState field
+# their value travels in.
+WIDGET_VALUE_FIELDS = {
+    'multiselect': 'string_array_value',
+    'slider': 'double_array_value',
+}
+
+
+def widget_key(widget_id):
+    """User key of a widget id such as ``$$ID-<hash>-filter_Weather``, else the id itself."""
+    if widget_id.startswith('$$ID-'):
+        return widget_id.split('-', 2)[2]
+    return widget_id
+
+
+class AppSession:
+    """One browser-like session: ``async with AppSession(url) as s: await s.run()``."""
+
+    def __init__(self, url):
+        self.url = url.replace('http', 'ws', 1) + '/_stcore/stream'
+        self.pages = {}       # page title -> page_script_hash, from the navigation message
+        self.page = ''
+        self.widgets = {}     # widget key -> (element type, element proto), drawn by the last run
+        self._values = {}     # widget id -> value set by the client
+        self._ws = None
+
+    async def __aenter__(self):
+        self._ws = await connect(self.url, subprotocols=['streamlit'], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._ws.close()
+
+    async def run(self, page=None, widgets=None):
+        """Rerun the app, optionally switching to the page titled ``page``.
+
+        ``widgets`` maps widget keys drawn by the previous run to new values
+        (a list of options for a multiselect, ``(low, high)`` for a range
+        slider). Like the browser, the session keeps sending the values it has
+        set for as long as the widgets stay on screen.
+        """
+        for key, value in (widgets or {}).items():
+            _, element = self.widgets[key]
+            self._values[element.id] = value
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        # Like the browser, stay on the current page unless told otherwise.
+        if (page or self.page) in self.pages:
+            msg.rerun_script.page_script_hash = self.pages[page or self.page]
+        kinds = {element.id: kind for kind, element in self.widgets.values()}
+        for widget_id, value in self._values.items():
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            getattr(state, WIDGET_VALUE_FIELDS[kinds[widget_id]]).data.extend(value)
+        started = time.perf_counter()
+        await self._ws.send(msg.SerializeToString())
+
+        result = RunResult(page=page or self.page, seconds=0.0, first_delta_s=0.0)
+        drawn = {}
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self._ws.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'navigation':
+                self.pages = {p.page_name: p.page_script_hash for p in forward.navigation.app_pages}
+                by_hash = {h: name for name, h in self.pages.items()}
+                self.page = result.page = by_hash.get(forward.navigation.page_script_hash, result.page)
+            elif kind == 'delta':
+                if not result.deltas:
+                    result.first_delta_s = time.perf_counter() - started
+                result.deltas += 1
+                delta = forward.delta
+                if delta.HasField('new_element'):
+                    element_type = delta.new_element.WhichOneof('type')
+                    if element_type == 'exception':
+                        result.exceptions.append(delta.new_element.exception.message)
+                    elif element_type in WIDGET_VALUE_FIELDS:
+                        element = getattr(delta.new_element, element_type)
+                        drawn[widget_key(element.id)] = (element_type, element)
+            elif kind == 'script_finished':
+                result.status = forward.script_finished
+                result.seconds = time.perf_counter() - started
+                # Widgets that were not drawn again lose their values, as in the browser.
+                self.widgets = drawn
+                ids = {element.id for _, element in drawn.values()}
+                self._values = {k: v for k, v in self._values.items() if k in ids}
+                return result
+
+
+def first_run(url, page=None):
+    """Open one session, run it once and return the :class:`RunResult`."""
+    async def _run():
+        async with AppSession(url) as session:
+            if page is not None:
+                await session.run()
+            return await session.run(page)
+    return asyncio.run(_run())
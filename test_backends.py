@@ -0,0 +1,26 @@
+"""The pandas and duckdb backends must answer every page query identically."""
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('duckdb')
+
+from backends import COMPARE_CASES, DuckDBBackend, PandasBackend, compare_backends
+from dataset import read_dataset
+
+DATA = Path(__file__).with_name('student_df.csv')
+
+
+@pytest.fixture(scope='module')
+def backends(tmp_path_factory):
+    # A private copy, so the Parquet caches both backends write stay out of the tree.
+    path = tmp_path_factory.mktemp('data') / DATA.name
+    shutil.copyfile(DATA, path)
+    return PandasBackend(read_dataset(path)), DuckDBBackend(path)
+
+
+@pytest.mark.parametrize('filters', COMPARE_CASES, ids=lambda filters: filters.describe() or 'no filters')
+def test_backends_agree(backends, filters):
+    reference, candidate = backends
+    assert compare_backends(reference, candidate, cases=[filters]) == []
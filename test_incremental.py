@@ -0,0 +1,159 @@
+"""IncrementalAggregator must match a full re-read across appends, partial writes and rewrites."""
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import AGGREGATE_COLUMNS, aggregate_frame
+from association import encode_columns, pairwise_cramers_v, severity_associations
+from incremental import IncrementalAggregator
+
+DATA = Path(__file__).with_name('student_df.csv')
+ROWS = 200
+
+
+def expected(path):
+    """Aggregates of ``path`` read from scratch, as the pages would see them."""
+    frame = pd.read_csv(path, usecols=lambda column: column in AGGREGATE_COLUMNS)
+    return aggregate_frame(frame)
+
+
+def assert_matches(state, path):
+    reference = expected(path)
+    assert state.aggregates.rows == reference.rows
+    for pair in reference.pair_counts:
+        pd.testing.assert_frame_equal(state.aggregates.crosstab(*pair), reference.crosstab(*pair))
+
+
+def touch(path, ns):
+    """Move the mtime forward, so same-size writes in one clock tick are still seen."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + ns))
+
+
+@pytest.fixture
+def source():
+    with open(DATA, 'rb') as fh:
+        lines = fh.readlines()
+    return lines[0], lines[1:]
+
+
+@pytest.fixture
+def path(tmp_path, source):
+    header, rows = source
+    path = tmp_path / DATA.name
+    path.write_bytes(header + b''.join(rows[:ROWS]))
+    return path
+
+
+def append(path, data):
+    with open(path, 'ab') as fh:
+        fh.write(data)
+
+
+def test_append(path, source):
+    aggregator = IncrementalAggregator(path)
+    first = aggregator.refresh()
+    assert_matches(first, path)
+
+    append(path, b''.join(source[1][ROWS:ROWS + 50]))
+    state = aggregator.refresh()
+    assert_matches(state, path)
+    assert state.rebuilds == 1
+    assert state.offset > first.offset
+    assert state.version != first.version
+
+
+def test_partial_line(path, source):
+    aggregator = IncrementalAggregator(path)
+    before = aggregator.refresh()
+    line = source[1][ROWS]
+    # Every field present, but the last value cut short by a write in progress.
+    clipped = line[:line.rindex(b',') + 4]
+    append(path, clipped)
+
+    state = aggregator.refresh()
+    assert state.aggregates.rows == before.aggregates.rows
+    assert state.version == before.version
+
+    append(path, line[len(clipped):])
+    state = aggregator.refresh()
+    assert_matches(state, path)
+    assert state.rebuilds == 1
+
+
+def test_unterminated_last_line_counts_once_stable(path, source):
+    line = source[1][ROWS].rstrip(b'\r\n')
+    append(path, line)
+    aggregator = IncrementalAggregator(path)
+    assert aggregator.refresh().aggregates.rows == ROWS
+    # No growth since the last refresh: a final line without a newline.
+    state = aggregator.refresh()
+    assert_matches(state, path)
+    assert state is aggregator.refresh()
+
+
+def test_associations_from_pair_counts(path, source):
+    aggregator = IncrementalAggregator(path)
+    aggregator.refresh()
+    append(path, b''.join(source[1][ROWS:ROWS + 50]))
+    ranked, matrix = aggregator.refresh().aggregates.associations()
+
+    frame = pd.read_csv(path)
+    encoded = encode_columns(frame)
+    expected_ranked = severity_associations(frame, encoded=encoded).set_index('Factor').sort_index()
+    expected_matrix = pairwise_cramers_v(frame, encoded=encoded)
+    ranked = ranked.set_index('Factor').sort_index()
+    assert list(ranked.index) == list(expected_ranked.index)
+    assert np.allclose(ranked.to_numpy(dtype=float), expected_ranked.to_numpy(dtype=float))
+    assert list(matrix.columns) == list(frame.columns)
+    assert np.allclose(matrix.to_numpy(), expected_matrix.to_numpy())
+
+
+def test_same_size_edit(path):
+    aggregator = IncrementalAggregator(path)
+    aggregator.refresh()
+    data = path.read_bytes()
+    edited = data.replace(b'Clear', b'Foggy', 1)
+    assert edited != data and len(edited) == len(data)
+    path.write_bytes(edited)
+    touch(path, 1_000_000)
+
+    state = aggregator.refresh()
+    assert_matches(state, path)
+    assert state.rebuilds == 2
+
+
+def test_edit_plus_grow(path, source):
+    aggregator = IncrementalAggregator(path)
+    aggregator.refresh()
+    data = path.read_bytes().replace(b'Clear', b'Foggy', 1)
+    path.write_bytes(data + b''.join(source[1][ROWS:ROWS + 10]))
+
+    state = aggregator.refresh()
+    assert_matches(state, path)
+    assert state.rebuilds == 2
+
+
+def test_edit_plus_grow_beyond_first_block(tmp_path, source):
+    # Large enough to span several check blocks; the edit sits past the first one.
+    header, rows = source
+    path = tmp_path / DATA.name
+    body = io.BytesIO()
+    while body.tell() < 4 * (64 << 10):
+        body.write(b''.join(rows))
+    path.write_bytes(header + body.getvalue())
+    aggregator = IncrementalAggregator(path)
+    aggregator.refresh()
+
+    data = bytearray(path.read_bytes())
+    at = data.index(b'Clear', 2 * (64 << 10))
+    data[at:at + 5] = b'Foggy'
+    path.write_bytes(bytes(data) + b''.join(rows[:10]))
+
+    state = aggregator.refresh()
+    assert_matches(state, path)
+    assert state.rebuilds == 2
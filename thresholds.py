@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+
+import numpy as np
+import streamlit as st
+
+from instrumentation import timed
+
+# --- Data-driven risk thresholds ---
+# For each numeric variable every distinct value is a candidate cut point, in
+# both directions ("x < t" and "x > t"). Sorting the values once and taking
+# cumulative counts of rows and severe rows gives the severe-accident rate on
+# each side of every cut at once, so the sweep is O(n log n) instead of one
+# scan per candidate threshold. The cut with the highest lift (severe rate on
+# the risky side divided by the overall severe rate) wins, subject to a
+# minimum share of rows on that side.
+
+RISK_COLUMNS = ['Biker_Age', 'Bike_Speed', 'Traffic_Density', 'Number_of_Vehicles']
+SEVERE_LABEL = 'Severe Accident'
+MIN_SUPPORT = 0.05
+
+
+@dataclass(frozen=True)
+class Threshold:
+    """Best cut point for one variable."""
+    column: str
+    operator: str       # '<' or '>'
+    value: float
+    lift: float         # severe rate beyond the cut / overall severe rate
+    severe_rate: float  # severe rate beyond the cut
+    support: int        # rows beyond the cut
+
+    def label(self):
+        return f"{self.operator} {self.value:g}"
+
+
+def sweep_thresholds(values, severe, min_support=MIN_SUPPORT):
+    """Evaluate every cut of ``values`` and return the lift table.
+
+    Returns ``(cuts, operators, lifts, rates, supports)`` arrays with two
+    entries per distinct value (``<`` then ``>``); cuts with less than
+    ``min_support`` of the rows on the risky side get a lift of NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    severe = np.asarray(severe, dtype=bool)
+    keep = ~np.isnan(values)
+    values, severe = values[keep], severe[keep]
+    n = values.size
+    if n == 0:
+        empty = np.empty(0)
+        return empty, np.empty(0, dtype='<U1'), empty, empty, empty.astype(np.int64)
+
+    cuts, inverse = np.unique(values, return_inverse=True)
+    rows = np.bincount(inverse, minlength=cuts.size)
+    hits = np.bincount(inverse, weights=severe, minlength=cuts.size)
+    rows_upto = np.cumsum(rows)          # rows with value <= cut
+    hits_upto = np.cumsum(hits)
+
+    below_rows = rows_upto - rows        # value < cut
+    below_hits = hits_upto - hits
+    above_rows = n - rows_upto           # value > cut
+    above_hits = hits_upto[-1] - hits_upto
+
+    supports = np.concatenate([below_rows, above_rows])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = np.concatenate([below_hits, above_hits]) / supports
+    base_rate = hits_upto[-1] / n
+    lifts = rates / base_rate if base_rate else np.full(rates.shape, np.nan)
+    lifts = np.where(supports >= max(1, min_support * n), lifts, np.nan)
+
+    operators = np.repeat(np.array(['<', '>']), cuts.size)
+    return np.concatenate([cuts, cuts]), operators, lifts, rates, supports
+
+
+def best_threshold(df, column, severity_column='Accident_Severity', severe_label=SEVERE_LABEL,
+                   min_support=MIN_SUPPORT):
+    """Return the :class:`Threshold` with the highest severe-accident lift, or ``None``."""
+    severe = (df[severity_column] == severe_label).to_numpy()
+    cuts, operators, lifts, rates, supports = sweep_thresholds(df[column], severe, min_support)
+    if lifts.size == 0 or np.all(np.isnan(lifts)):
+        return None
+    best = int(np.nanargmax(lifts))
+    return Threshold(
+        column=column,
+        operator=str(operators[best]),
+        value=float(cuts[best]),
+        lift=float(lifts[best]),
+        severe_rate=float(rates[best]),
+        support=int(supports[best]),
+    )
+
+
+def find_thresholds(df, columns=RISK_COLUMNS, min_support=MIN_SUPPORT):
+    """Best threshold for each of ``columns`` present in ``df``."""
+    return {
+        column: best_threshold(df, column, min_support=min_support)
+        for column in columns if column in df
+    }
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+@timed('aggregate', 'risk thresholds')
+def _thresholds_for_version(version, _df, columns, min_support):
+    return find_thresholds(_df, columns, min_support)
+
+
+def get_thresholds(version, df, columns=RISK_COLUMNS, min_support=MIN_SUPPORT):
+    """:func:`find_thresholds` memoized per data ``version`` (dataset plus filters)."""
+    return _thresholds_for_version(version, df, tuple(columns), min_support)